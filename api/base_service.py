@@ -1,12 +1,17 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Tuple, TypeVar, Awaitable, Callable
+from typing import Dict, Tuple, TypeVar, Awaitable, Callable, AsyncIterator
 
 import grpclib.const
 from grpclib.const import Status, Cardinality
 from grpclib.exceptions import GRPCError
 from grpclib.server import Stream
 
-from domain.models import TaskType
+from domain.errors import NotFoundError, UnavailableError
+from utils.logger import AppLogger
+from utils.metrics import GRPC_HANDLER_SECONDS
+
+logger = AppLogger.get_logger(__name__)
 
 RequestType = TypeVar('RequestType')
 ResultType = TypeVar('ResultType')
@@ -21,12 +26,14 @@ class BaseGrpcService(ABC):
 
     @property
     @abstractmethod
-    def method_mapping(self) -> Dict[str, Tuple[str, Type, Type]]:
+    def method_mapping(self) -> Dict[str, Tuple]:
         """
-        Dictionary mapping gRPC method names to implementation details
+        Dictionary mapping gRPC method names to implementation details.
+        Methods are unary unless cardinality is given as the fourth element.
         Example:
         {
-            "GenerateContext": ("generate_context", RequestType, ResponseType)
+            "GenerateContext": ("generate_context", RequestType, ResponseType),
+            "WatchContext": ("watch_context", RequestType, ResponseType, Cardinality.UNARY_STREAM)
         }
         """
         pass
@@ -35,18 +42,43 @@ class BaseGrpcService(ABC):
         """Generates gRPC method mapping with handlers"""
         return {
             f"/{self.service_name}/{grpc_method}": grpclib.const.Handler(
-                func=getattr(self, impl_method),
-                cardinality=Cardinality.UNARY_UNARY,
+                func=self._timed(grpc_method, getattr(self, impl_method)),
+                cardinality=cardinality[0] if cardinality else Cardinality.UNARY_UNARY,
                 request_type=req_type,
                 reply_type=resp_type
             )
-            for grpc_method, (impl_method, req_type, resp_type) in self.method_mapping.items()
+            for grpc_method, (impl_method, req_type, resp_type, *cardinality) in self.method_mapping.items()
         }
 
+    @staticmethod
+    def _timed(grpc_method: str, func: Callable[[Stream], Awaitable[None]]) -> Callable[[Stream], Awaitable[None]]:
+        """Wrap a handler to record its duration by method and resulting status"""
+        async def handler(stream: Stream) -> None:
+            started = time.perf_counter()
+            status = Status.OK
+            try:
+                await func(stream)
+            except GRPCError as e:
+                status = e.status
+                raise
+            except Exception:
+                status = Status.UNKNOWN
+                raise
+            finally:
+                GRPC_HANDLER_SECONDS.labels(method=grpc_method, status=status.name).observe(
+                    time.perf_counter() - started
+                )
+
+        return handler
+
     def handle_error(self, e: Exception) -> None:
         """Common error handling for gRPC methods"""
         if isinstance(e, ValueError):
             raise GRPCError(Status.INVALID_ARGUMENT, str(e))
+        elif isinstance(e, NotFoundError):
+            raise GRPCError(Status.NOT_FOUND, str(e))
+        elif isinstance(e, UnavailableError):
+            raise GRPCError(Status.UNAVAILABLE, str(e))
         elif isinstance(e, NotImplementedError):
             raise GRPCError(Status.UNIMPLEMENTED, str(e))
         else:
@@ -64,5 +96,20 @@ class BaseGrpcService(ABC):
             result = await handler(request)
             await stream.send_message(response_factory(result))
         except Exception as e:
-            print(e)
-            self.handle_error(e)
\ No newline at end of file
+            logger.exception(f"Failed to handle request: {str(e)}")
+            self.handle_error(e)
+
+    async def _handle_stream_request(
+            self,
+            stream: Stream[RequestType, ResponseType],
+            handler: Callable[[RequestType], AsyncIterator[ResultType]],
+            response_factory: Callable[[ResultType], ResponseType]
+    ) -> None:
+        """Common server streaming logic, every result of the handler is sent as a separate message"""
+        try:
+            request = await stream.recv_message()
+            async for result in handler(request):
+                await stream.send_message(response_factory(result))
+        except Exception as e:
+            logger.exception(f"Failed to handle request: {str(e)}")
+            self.handle_error(e)
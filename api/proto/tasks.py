@@ -2,7 +2,7 @@
 # sources: tasks_service.proto
 # plugin: python-betterproto
 from dataclasses import dataclass
-from typing import List
+from typing import AsyncGenerator, List
 
 import betterproto
 import grpclib
@@ -18,6 +18,8 @@ class TaskStatus(betterproto.Enum):
     RUNNING = 1
     COMPLETED = 2
     FAILED = 3
+    CANCELLED = 4
+    DEAD_LETTERED = 5
 
 
 @dataclass
@@ -26,12 +28,14 @@ class Task(betterproto.Message):
     channel_id: int = betterproto.int64_field(2)
     task_type: "TaskType" = betterproto.enum_field(3)
     task_status: "TaskStatus" = betterproto.enum_field(4)
+    created_at_ms: int = betterproto.int64_field(5)
 
 
 @dataclass
 class CreateTaskRequest(betterproto.Message):
     channel_id: int = betterproto.int64_field(1)
     task_type: "TaskType" = betterproto.enum_field(2)
+    idempotency_key: str = betterproto.string_field(3)
 
 
 @dataclass
@@ -39,6 +43,7 @@ class CreateTaskWithUserNotificationRequest(betterproto.Message):
     channel_id: int = betterproto.int64_field(1)
     task_type: "TaskType" = betterproto.enum_field(2)
     user_id_to_notify: int = betterproto.int64_field(3)
+    idempotency_key: str = betterproto.string_field(4)
 
 
 @dataclass
@@ -47,6 +52,20 @@ class CreateTaskResponse(betterproto.Message):
     error_message: str = betterproto.string_field(2)
 
 
+@dataclass
+class CreateTasksRequest(betterproto.Message):
+    tasks: List["CreateTaskRequest"] = betterproto.message_field(1)
+
+
+@dataclass
+class CreateTasksResponse(betterproto.Message):
+    # One per request item in order. 0 where the item duplicated a task that
+    # finished meanwhile, or reused the idempotency key of a task of another
+    # channel or type
+    task_ids: List[int] = betterproto.int64_field(1)
+    error_message: str = betterproto.string_field(2)
+
+
 @dataclass
 class GetTaskRequest(betterproto.Message):
     task_id: int = betterproto.int64_field(1)
@@ -69,6 +88,33 @@ class GetChannelTasksResponse(betterproto.Message):
     error_message: str = betterproto.string_field(2)
 
 
+@dataclass
+class WatchTaskRequest(betterproto.Message):
+    task_id: int = betterproto.int64_field(1)
+
+
+@dataclass
+class WatchChannelTasksRequest(betterproto.Message):
+    channel_id: int = betterproto.int64_field(1)
+
+
+@dataclass
+class ListTasksRequest(betterproto.Message):
+    statuses: List["TaskStatus"] = betterproto.enum_field(1)
+    task_types: List["TaskType"] = betterproto.enum_field(2)
+    channel_id: int = betterproto.int64_field(3)
+    created_after_ms: int = betterproto.int64_field(4)
+    created_before_ms: int = betterproto.int64_field(5)
+    limit: int = betterproto.int64_field(6)
+    after_cursor: str = betterproto.string_field(7)
+
+
+@dataclass
+class ListTasksResponse(betterproto.Message):
+    task: "Task" = betterproto.message_field(1)
+    cursor: str = betterproto.string_field(2)
+
+
 class TasksServiceStub(betterproto.ServiceStub):
     async def create_task_with_user_notification(
         self,
@@ -76,11 +122,13 @@ class TasksServiceStub(betterproto.ServiceStub):
         channel_id: int = 0,
         task_type: "TaskType" = 0,
         user_id_to_notify: int = 0,
+        idempotency_key: str = "",
     ) -> CreateTaskResponse:
         request = CreateTaskWithUserNotificationRequest()
         request.channel_id = channel_id
         request.task_type = task_type
         request.user_id_to_notify = user_id_to_notify
+        request.idempotency_key = idempotency_key
 
         return await self._unary_unary(
             "/tasks.TasksService/CreateTaskWithUserNotification",
@@ -89,11 +137,21 @@ class TasksServiceStub(betterproto.ServiceStub):
         )
 
     async def create_task(
-        self, *, channel_id: int = 0, task_type: "TaskType" = 0
+        self,
+        *,
+        channel_id: int = 0,
+        task_type: "TaskType" = 0,
+        idempotency_key: str = "",
     ) -> CreateTaskResponse:
+        """
+        Returns the pending or running task of the channel and type instead of
+        creating a duplicate
+        """
+
         request = CreateTaskRequest()
         request.channel_id = channel_id
         request.task_type = task_type
+        request.idempotency_key = idempotency_key
 
         return await self._unary_unary(
             "/tasks.TasksService/CreateTask",
@@ -101,6 +159,19 @@ class TasksServiceStub(betterproto.ServiceStub):
             CreateTaskResponse,
         )
 
+    async def create_tasks(
+        self, *, tasks: List["CreateTaskRequest"] = []
+    ) -> CreateTasksResponse:
+        request = CreateTasksRequest()
+        if tasks is not None:
+            request.tasks = tasks
+
+        return await self._unary_unary(
+            "/tasks.TasksService/CreateTasks",
+            request,
+            CreateTasksResponse,
+        )
+
     async def get_task(self, *, task_id: int = 0) -> GetTaskResponse:
         request = GetTaskRequest()
         request.task_id = task_id
@@ -114,6 +185,11 @@ class TasksServiceStub(betterproto.ServiceStub):
     async def get_channel_tasks(
         self, *, channel_id: int = 0
     ) -> GetChannelTasksResponse:
+        """
+        Latest tasks of the channel in creation order, ListTasks with
+        channel_id lists its whole history
+        """
+
         request = GetChannelTasksRequest()
         request.channel_id = channel_id
 
@@ -122,3 +198,66 @@ class TasksServiceStub(betterproto.ServiceStub):
             request,
             GetChannelTasksResponse,
         )
+
+    async def watch_task(self, *, task_id: int = 0) -> AsyncGenerator[Task, None]:
+        """
+        Current state of the task, then every status change until it is
+        completed, failed or cancelled
+        """
+
+        request = WatchTaskRequest()
+        request.task_id = task_id
+
+        async for response in self._unary_stream(
+            "/tasks.TasksService/WatchTask",
+            request,
+            Task,
+        ):
+            yield response
+
+    async def watch_channel_tasks(
+        self, *, channel_id: int = 0
+    ) -> AsyncGenerator[Task, None]:
+        """
+        Current state of the latest tasks of the channel, then every status
+        change of its tasks
+        """
+
+        request = WatchChannelTasksRequest()
+        request.channel_id = channel_id
+
+        async for response in self._unary_stream(
+            "/tasks.TasksService/WatchChannelTasks",
+            request,
+            Task,
+        ):
+            yield response
+
+    async def list_tasks(
+        self,
+        *,
+        statuses: List["TaskStatus"] = [],
+        task_types: List["TaskType"] = [],
+        channel_id: int = 0,
+        created_after_ms: int = 0,
+        created_before_ms: int = 0,
+        limit: int = 0,
+        after_cursor: str = "",
+    ) -> AsyncGenerator[ListTasksResponse, None]:
+        """Tasks matching the filters ordered by creation time"""
+
+        request = ListTasksRequest()
+        request.statuses = statuses
+        request.task_types = task_types
+        request.channel_id = channel_id
+        request.created_after_ms = created_after_ms
+        request.created_before_ms = created_before_ms
+        request.limit = limit
+        request.after_cursor = after_cursor
+
+        async for response in self._unary_stream(
+            "/tasks.TasksService/ListTasks",
+            request,
+            ListTasksResponse,
+        ):
+            yield response
@@ -13,7 +13,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13tasks_service.proto\x12\x05tasks\"w\n\x04Task\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\x12\x12\n\nchannel_id\x18\x02 \x01(\x03\x12\"\n\ttask_type\x18\x03 \x01(\x0e\x32\x0f.tasks.TaskType\x12&\n\x0btask_status\x18\x04 \x01(\x0e\x32\x11.tasks.TaskStatus\"K\n\x11\x43reateTaskRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\x12\"\n\ttask_type\x18\x02 \x01(\x0e\x32\x0f.tasks.TaskType\"z\n%CreateTaskWithUserNotificationRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\x12\"\n\ttask_type\x18\x02 \x01(\x0e\x32\x0f.tasks.TaskType\x12\x19\n\x11user_id_to_notify\x18\x03 \x01(\x03\"<\n\x12\x43reateTaskResponse\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\x12\x15\n\rerror_message\x18\x02 \x01(\t\"!\n\x0eGetTaskRequest\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\"C\n\x0fGetTaskResponse\x12\x19\n\x04task\x18\x01 \x01(\x0b\x32\x0b.tasks.Task\x12\x15\n\rerror_message\x18\x05 \x01(\t\",\n\x16GetChannelTasksRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\"L\n\x17GetChannelTasksResponse\x12\x1a\n\x05tasks\x18\x01 \x03(\x0b\x32\x0b.tasks.Task\x12\x15\n\rerror_message\x18\x02 \x01(\t*3\n\x08TaskType\x12\x12\n\x0eSTART_TRACKING\x10\x00\x12\x13\n\x0fREVISIT_CHANNEL\x10\x01*A\n\nTaskStatus\x12\x0b\n\x07PENDING\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\r\n\tCOMPLETED\x10\x02\x12\n\n\x06\x46\x41ILED\x10\x03\x32\xc8\x02\n\x0cTasksService\x12i\n\x1e\x43reateTaskWithUserNotification\x12,.tasks.CreateTaskWithUserNotificationRequest\x1a\x19.tasks.CreateTaskResponse\x12\x41\n\nCreateTask\x12\x18.tasks.CreateTaskRequest\x1a\x19.tasks.CreateTaskResponse\x12\x38\n\x07GetTask\x12\x15.tasks.GetTaskRequest\x1a\x16.tasks.GetTaskResponse\x12P\n\x0fGetChannelTasks\x12\x1d.tasks.GetChannelTasksRequest\x1a\x1e.tasks.GetChannelTasksResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13tasks_service.proto\x12\x05tasks\"\x8e\x01\n\x04Task\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\x12\x12\n\nchannel_id\x18\x02 \x01(\x03\x12\"\n\ttask_type\x18\x03 \x01(\x0e\x32\x0f.tasks.TaskType\x12&\n\x0btask_status\x18\x04 \x01(\x0e\x32\x11.tasks.TaskStatus\x12\x15\n\rcreated_at_ms\x18\x05 \x01(\x03\"d\n\x11\x43reateTaskRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\x12\"\n\ttask_type\x18\x02 \x01(\x0e\x32\x0f.tasks.TaskType\x12\x17\n\x0fidempotency_key\x18\x03 \x01(\t\"\x93\x01\n%CreateTaskWithUserNotificationRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\x12\"\n\ttask_type\x18\x02 \x01(\x0e\x32\x0f.tasks.TaskType\x12\x19\n\x11user_id_to_notify\x18\x03 \x01(\x03\x12\x17\n\x0fidempotency_key\x18\x04 \x01(\t\"<\n\x12\x43reateTaskResponse\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\x12\x15\n\rerror_message\x18\x02 \x01(\t\"=\n\x12\x43reateTasksRequest\x12\'\n\x05tasks\x18\x01 \x03(\x0b\x32\x18.tasks.CreateTaskRequest\">\n\x13\x43reateTasksResponse\x12\x10\n\x08task_ids\x18\x01 \x03(\x03\x12\x15\n\rerror_message\x18\x02 \x01(\t\"!\n\x0eGetTaskRequest\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\"C\n\x0fGetTaskResponse\x12\x19\n\x04task\x18\x01 \x01(\x0b\x32\x0b.tasks.Task\x12\x15\n\rerror_message\x18\x05 \x01(\t\",\n\x16GetChannelTasksRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\"L\n\x17GetChannelTasksResponse\x12\x1a\n\x05tasks\x18\x01 \x03(\x0b\x32\x0b.tasks.Task\x12\x15\n\rerror_message\x18\x02 \x01(\t\"#\n\x10WatchTaskRequest\x12\x0f\n\x07task_id\x18\x01 \x01(\x03\".\n\x18WatchChannelTasksRequest\x12\x12\n\nchannel_id\x18\x01 \x01(\x03\"\xca\x01\n\x10ListTasksRequest\x12#\n\x08statuses\x18\x01 \x03(\x0e\x32\x11.tasks.TaskStatus\x12#\n\ntask_types\x18\x02 \x03(\x0e\x32\x0f.tasks.TaskType\x12\x12\n\nchannel_id\x18\x03 \x01(\x03\x12\x18\n\x10\x63reated_after_ms\x18\x04 \x01(\x03\x12\x19\n\x11\x63reated_before_ms\x18\x05 \x01(\x03\x12\r\n\x05limit\x18\x06 \x01(\x03\x12\x14\n\x0c\x61\x66ter_cursor\x18\x07 \x01(\t\">\n\x11ListTasksResponse\x12\x19\n\x04task\x18\x01 \x01(\x0b\x32\x0b.tasks.Task\x12\x0e\n\x06\x63ursor\x18\x02 \x01(\t*3\n\x08TaskType\x12\x12\n\x0eSTART_TRACKING\x10\x00\x12\x13\n\x0fREVISIT_CHANNEL\x10\x01*c\n\nTaskStatus\x12\x0b\n\x07PENDING\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\r\n\tCOMPLETED\x10\x02\x12\n\n\x06\x46\x41ILED\x10\x03\x12\r\n\tCANCELLED\x10\x04\x12\x11\n\rDEAD_LETTERED\x10\x05\x32\xca\x04\n\x0cTasksService\x12i\n\x1e\x43reateTaskWithUserNotification\x12,.tasks.CreateTaskWithUserNotificationRequest\x1a\x19.tasks.CreateTaskResponse\x12\x41\n\nCreateTask\x12\x18.tasks.CreateTaskRequest\x1a\x19.tasks.CreateTaskResponse\x12\x44\n\x0b\x43reateTasks\x12\x19.tasks.CreateTasksRequest\x1a\x1a.tasks.CreateTasksResponse\x12\x38\n\x07GetTask\x12\x15.tasks.GetTaskRequest\x1a\x16.tasks.GetTaskResponse\x12P\n\x0fGetChannelTasks\x12\x1d.tasks.GetChannelTasksRequest\x1a\x1e.tasks.GetChannelTasksResponse\x12\x33\n\tWatchTask\x12\x17.tasks.WatchTaskRequest\x1a\x0b.tasks.Task0\x01\x12\x43\n\x11WatchChannelTasks\x12\x1f.tasks.WatchChannelTasksRequest\x1a\x0b.tasks.Task0\x01\x12@\n\tListTasks\x12\x17.tasks.ListTasksRequest\x1a\x18.tasks.ListTasksResponse0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -21,26 +21,38 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'tasks_service_pb2', _global
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
-  _globals['_TASKTYPE']._serialized_start=642
-  _globals['_TASKTYPE']._serialized_end=693
-  _globals['_TASKSTATUS']._serialized_start=695
-  _globals['_TASKSTATUS']._serialized_end=760
-  _globals['_TASK']._serialized_start=30
-  _globals['_TASK']._serialized_end=149
-  _globals['_CREATETASKREQUEST']._serialized_start=151
-  _globals['_CREATETASKREQUEST']._serialized_end=226
-  _globals['_CREATETASKWITHUSERNOTIFICATIONREQUEST']._serialized_start=228
-  _globals['_CREATETASKWITHUSERNOTIFICATIONREQUEST']._serialized_end=350
-  _globals['_CREATETASKRESPONSE']._serialized_start=352
-  _globals['_CREATETASKRESPONSE']._serialized_end=412
-  _globals['_GETTASKREQUEST']._serialized_start=414
-  _globals['_GETTASKREQUEST']._serialized_end=447
-  _globals['_GETTASKRESPONSE']._serialized_start=449
-  _globals['_GETTASKRESPONSE']._serialized_end=516
-  _globals['_GETCHANNELTASKSREQUEST']._serialized_start=518
-  _globals['_GETCHANNELTASKSREQUEST']._serialized_end=562
-  _globals['_GETCHANNELTASKSRESPONSE']._serialized_start=564
-  _globals['_GETCHANNELTASKSRESPONSE']._serialized_end=640
-  _globals['_TASKSSERVICE']._serialized_start=763
-  _globals['_TASKSSERVICE']._serialized_end=1091
+  _globals['_TASKTYPE']._serialized_start=1198
+  _globals['_TASKTYPE']._serialized_end=1249
+  _globals['_TASKSTATUS']._serialized_start=1251
+  _globals['_TASKSTATUS']._serialized_end=1350
+  _globals['_TASK']._serialized_start=31
+  _globals['_TASK']._serialized_end=173
+  _globals['_CREATETASKREQUEST']._serialized_start=175
+  _globals['_CREATETASKREQUEST']._serialized_end=275
+  _globals['_CREATETASKWITHUSERNOTIFICATIONREQUEST']._serialized_start=278
+  _globals['_CREATETASKWITHUSERNOTIFICATIONREQUEST']._serialized_end=425
+  _globals['_CREATETASKRESPONSE']._serialized_start=427
+  _globals['_CREATETASKRESPONSE']._serialized_end=487
+  _globals['_CREATETASKSREQUEST']._serialized_start=489
+  _globals['_CREATETASKSREQUEST']._serialized_end=550
+  _globals['_CREATETASKSRESPONSE']._serialized_start=552
+  _globals['_CREATETASKSRESPONSE']._serialized_end=614
+  _globals['_GETTASKREQUEST']._serialized_start=616
+  _globals['_GETTASKREQUEST']._serialized_end=649
+  _globals['_GETTASKRESPONSE']._serialized_start=651
+  _globals['_GETTASKRESPONSE']._serialized_end=718
+  _globals['_GETCHANNELTASKSREQUEST']._serialized_start=720
+  _globals['_GETCHANNELTASKSREQUEST']._serialized_end=764
+  _globals['_GETCHANNELTASKSRESPONSE']._serialized_start=766
+  _globals['_GETCHANNELTASKSRESPONSE']._serialized_end=842
+  _globals['_WATCHTASKREQUEST']._serialized_start=844
+  _globals['_WATCHTASKREQUEST']._serialized_end=879
+  _globals['_WATCHCHANNELTASKSREQUEST']._serialized_start=881
+  _globals['_WATCHCHANNELTASKSREQUEST']._serialized_end=927
+  _globals['_LISTTASKSREQUEST']._serialized_start=930
+  _globals['_LISTTASKSREQUEST']._serialized_end=1132
+  _globals['_LISTTASKSRESPONSE']._serialized_start=1134
+  _globals['_LISTTASKSRESPONSE']._serialized_end=1196
+  _globals['_TASKSSERVICE']._serialized_start=1353
+  _globals['_TASKSSERVICE']._serialized_end=1939
 # @@protoc_insertion_point(module_scope)
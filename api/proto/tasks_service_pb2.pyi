@@ -44,6 +44,8 @@ class _TaskStatusEnumTypeWrapper(google.protobuf.internal.enum_type_wrapper._Enu
     RUNNING: _TaskStatus.ValueType  # 1
     COMPLETED: _TaskStatus.ValueType  # 2
     FAILED: _TaskStatus.ValueType  # 3
+    CANCELLED: _TaskStatus.ValueType  # 4
+    DEAD_LETTERED: _TaskStatus.ValueType  # 5
 
 class TaskStatus(_TaskStatus, metaclass=_TaskStatusEnumTypeWrapper): ...
 
@@ -51,6 +53,8 @@ PENDING: TaskStatus.ValueType  # 0
 RUNNING: TaskStatus.ValueType  # 1
 COMPLETED: TaskStatus.ValueType  # 2
 FAILED: TaskStatus.ValueType  # 3
+CANCELLED: TaskStatus.ValueType  # 4
+DEAD_LETTERED: TaskStatus.ValueType  # 5
 global___TaskStatus = TaskStatus
 
 @typing.final
@@ -61,10 +65,13 @@ class Task(google.protobuf.message.Message):
     CHANNEL_ID_FIELD_NUMBER: builtins.int
     TASK_TYPE_FIELD_NUMBER: builtins.int
     TASK_STATUS_FIELD_NUMBER: builtins.int
+    CREATED_AT_MS_FIELD_NUMBER: builtins.int
     task_id: builtins.int
     channel_id: builtins.int
     task_type: global___TaskType.ValueType
     task_status: global___TaskStatus.ValueType
+    created_at_ms: builtins.int
+    """Unix time in milliseconds, 0 in status change updates"""
     def __init__(
         self,
         *,
@@ -72,8 +79,9 @@ class Task(google.protobuf.message.Message):
         channel_id: builtins.int = ...,
         task_type: global___TaskType.ValueType = ...,
         task_status: global___TaskStatus.ValueType = ...,
+        created_at_ms: builtins.int = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "task_id", b"task_id", "task_status", b"task_status", "task_type", b"task_type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "created_at_ms", b"created_at_ms", "task_id", b"task_id", "task_status", b"task_status", "task_type", b"task_type"]) -> None: ...
 
 global___Task = Task
 
@@ -83,15 +91,19 @@ class CreateTaskRequest(google.protobuf.message.Message):
 
     CHANNEL_ID_FIELD_NUMBER: builtins.int
     TASK_TYPE_FIELD_NUMBER: builtins.int
+    IDEMPOTENCY_KEY_FIELD_NUMBER: builtins.int
     channel_id: builtins.int
     task_type: global___TaskType.ValueType
+    idempotency_key: builtins.str
+    """Optional, requests with the same key get the task created by the first one"""
     def __init__(
         self,
         *,
         channel_id: builtins.int = ...,
         task_type: global___TaskType.ValueType = ...,
+        idempotency_key: builtins.str = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "task_type", b"task_type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "idempotency_key", b"idempotency_key", "task_type", b"task_type"]) -> None: ...
 
 global___CreateTaskRequest = CreateTaskRequest
 
@@ -102,17 +114,21 @@ class CreateTaskWithUserNotificationRequest(google.protobuf.message.Message):
     CHANNEL_ID_FIELD_NUMBER: builtins.int
     TASK_TYPE_FIELD_NUMBER: builtins.int
     USER_ID_TO_NOTIFY_FIELD_NUMBER: builtins.int
+    IDEMPOTENCY_KEY_FIELD_NUMBER: builtins.int
     channel_id: builtins.int
     task_type: global___TaskType.ValueType
     user_id_to_notify: builtins.int
+    idempotency_key: builtins.str
+    """Optional, requests with the same key get the task created by the first one"""
     def __init__(
         self,
         *,
         channel_id: builtins.int = ...,
         task_type: global___TaskType.ValueType = ...,
         user_id_to_notify: builtins.int = ...,
+        idempotency_key: builtins.str = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "task_type", b"task_type", "user_id_to_notify", b"user_id_to_notify"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id", "idempotency_key", b"idempotency_key", "task_type", b"task_type", "user_id_to_notify", b"user_id_to_notify"]) -> None: ...
 
 global___CreateTaskWithUserNotificationRequest = CreateTaskWithUserNotificationRequest
 
@@ -134,6 +150,41 @@ class CreateTaskResponse(google.protobuf.message.Message):
 
 global___CreateTaskResponse = CreateTaskResponse
 
+@typing.final
+class CreateTasksRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TASKS_FIELD_NUMBER: builtins.int
+    @property
+    def tasks(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___CreateTaskRequest]: ...
+    def __init__(
+        self,
+        *,
+        tasks: collections.abc.Iterable[global___CreateTaskRequest] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["tasks", b"tasks"]) -> None: ...
+
+global___CreateTasksRequest = CreateTasksRequest
+
+@typing.final
+class CreateTasksResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TASK_IDS_FIELD_NUMBER: builtins.int
+    ERROR_MESSAGE_FIELD_NUMBER: builtins.int
+    error_message: builtins.str
+    @property
+    def task_ids(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.int]: ...
+    def __init__(
+        self,
+        *,
+        task_ids: collections.abc.Iterable[builtins.int] | None = ...,
+        error_message: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["error_message", b"error_message", "task_ids", b"task_ids"]) -> None: ...
+
+global___CreateTasksResponse = CreateTasksResponse
+
 @typing.final
 class GetTaskRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -202,3 +253,97 @@ class GetChannelTasksResponse(google.protobuf.message.Message):
     def ClearField(self, field_name: typing.Literal["error_message", b"error_message", "tasks", b"tasks"]) -> None: ...
 
 global___GetChannelTasksResponse = GetChannelTasksResponse
+
+@typing.final
+class WatchTaskRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TASK_ID_FIELD_NUMBER: builtins.int
+    task_id: builtins.int
+    def __init__(
+        self,
+        *,
+        task_id: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["task_id", b"task_id"]) -> None: ...
+
+global___WatchTaskRequest = WatchTaskRequest
+
+@typing.final
+class WatchChannelTasksRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    CHANNEL_ID_FIELD_NUMBER: builtins.int
+    channel_id: builtins.int
+    def __init__(
+        self,
+        *,
+        channel_id: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["channel_id", b"channel_id"]) -> None: ...
+
+global___WatchChannelTasksRequest = WatchChannelTasksRequest
+
+@typing.final
+class ListTasksRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    STATUSES_FIELD_NUMBER: builtins.int
+    TASK_TYPES_FIELD_NUMBER: builtins.int
+    CHANNEL_ID_FIELD_NUMBER: builtins.int
+    CREATED_AFTER_MS_FIELD_NUMBER: builtins.int
+    CREATED_BEFORE_MS_FIELD_NUMBER: builtins.int
+    LIMIT_FIELD_NUMBER: builtins.int
+    AFTER_CURSOR_FIELD_NUMBER: builtins.int
+    channel_id: builtins.int
+    """0 lists tasks of all channels"""
+    created_after_ms: builtins.int
+    """Unix time in milliseconds, inclusive, 0 is unbounded"""
+    created_before_ms: builtins.int
+    """Unix time in milliseconds, exclusive, 0 is unbounded"""
+    limit: builtins.int
+    """0 lists all matching tasks"""
+    after_cursor: builtins.str
+    """Cursor of the last received task, continues an interrupted listing"""
+    @property
+    def statuses(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[global___TaskStatus.ValueType]:
+        """Empty lists tasks in any status"""
+
+    @property
+    def task_types(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[global___TaskType.ValueType]:
+        """Empty lists tasks of any type"""
+
+    def __init__(
+        self,
+        *,
+        statuses: collections.abc.Iterable[global___TaskStatus.ValueType] | None = ...,
+        task_types: collections.abc.Iterable[global___TaskType.ValueType] | None = ...,
+        channel_id: builtins.int = ...,
+        created_after_ms: builtins.int = ...,
+        created_before_ms: builtins.int = ...,
+        limit: builtins.int = ...,
+        after_cursor: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["after_cursor", b"after_cursor", "channel_id", b"channel_id", "created_after_ms", b"created_after_ms", "created_before_ms", b"created_before_ms", "limit", b"limit", "statuses", b"statuses", "task_types", b"task_types"]) -> None: ...
+
+global___ListTasksRequest = ListTasksRequest
+
+@typing.final
+class ListTasksResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TASK_FIELD_NUMBER: builtins.int
+    CURSOR_FIELD_NUMBER: builtins.int
+    cursor: builtins.str
+    @property
+    def task(self) -> global___Task: ...
+    def __init__(
+        self,
+        *,
+        task: global___Task | None = ...,
+        cursor: builtins.str = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["task", b"task"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["cursor", b"cursor", "task", b"task"]) -> None: ...
+
+global___ListTasksResponse = ListTasksResponse
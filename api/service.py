@@ -1,12 +1,18 @@
-from typing import Tuple, Optional
+import base64
+from datetime import datetime, timezone
+from typing import Tuple, Optional, List, AsyncIterator, Union
 
+from grpclib.const import Cardinality
 from grpclib.server import Stream
 from injector import inject
 
 from api.base_service import BaseGrpcService
 from api.proto.tasks import CreateTaskRequest, CreateTaskResponse, GetTaskRequest, GetTaskResponse, \
-    GetChannelTasksRequest, GetChannelTasksResponse, CreateTaskWithUserNotificationRequest
-from domain.models import Task, TaskCreate, TaskType
+    GetChannelTasksRequest, GetChannelTasksResponse, CreateTaskWithUserNotificationRequest, CreateTasksRequest, \
+    CreateTasksResponse, Task as ProtoTask, TaskType as ProtoTaskType, TaskStatus as ProtoTaskStatus, \
+    WatchTaskRequest, WatchChannelTasksRequest, ListTasksRequest, ListTasksResponse
+from domain.models import Task, TaskCreate, TaskType, TaskStatusChange, TaskFilter, TaskStatus
+from domain.rows import TaskRow
 from services.tasks_service import TasksService
 from utils.logger import AppLogger
 
@@ -27,9 +33,13 @@ class TasksGrpcService(BaseGrpcService):
     def method_mapping(self):
         return {
             "CreateTask": ("create_task", CreateTaskRequest, CreateTaskResponse),
+            "CreateTasks": ("create_tasks", CreateTasksRequest, CreateTasksResponse),
             "GetTask": ("get_task", GetTaskRequest, GetTaskResponse),
-            "GetChannelTasks": ("get_channel_tasks", GetTaskRequest, GetTaskResponse),
+            "GetChannelTasks": ("get_channel_tasks", GetChannelTasksRequest, GetChannelTasksResponse),
             "CreateTaskWithUserNotification": ("create_task_with_user_notification", CreateTaskWithUserNotificationRequest, CreateTaskResponse),
+            "WatchTask": ("watch_task", WatchTaskRequest, ProtoTask, Cardinality.UNARY_STREAM),
+            "WatchChannelTasks": ("watch_channel_tasks", WatchChannelTasksRequest, ProtoTask, Cardinality.UNARY_STREAM),
+            "ListTasks": ("list_tasks", ListTasksRequest, ListTasksResponse, Cardinality.UNARY_STREAM),
         }
 
     @inject
@@ -40,7 +50,9 @@ class TasksGrpcService(BaseGrpcService):
     async def create_task(self, stream: Stream[CreateTaskRequest, CreateTaskResponse]) -> None:
         async def handler(req: CreateTaskRequest) -> Tuple[Optional[Task], Optional[str]]:
             return await self.tasks_service.create_task(
-                TaskCreate(channel_id=req.channel_id, task_type=self._task_type_from_proto(req.task_type)))
+                TaskCreate(channel_id=req.channel_id, task_type=self._task_type_from_proto(req.task_type)),
+                idempotency_key=req.idempotency_key or None
+            )
 
         def response_factory(result: Tuple[Optional[Task], Optional[str]]) -> CreateTaskResponse:
             task, error = result
@@ -54,6 +66,29 @@ class TasksGrpcService(BaseGrpcService):
             response_factory=response_factory
         )
 
+    async def create_tasks(self, stream: Stream[CreateTasksRequest, CreateTasksResponse]) -> None:
+        async def handler(req: CreateTasksRequest) -> Tuple[List[Optional[TaskRow]], Optional[str]]:
+            return await self.tasks_service.create_tasks_bulk(
+                [
+                    TaskCreate(channel_id=task.channel_id, task_type=self._task_type_from_proto(task.task_type))
+                    for task in req.tasks
+                ],
+                idempotency_keys=[task.idempotency_key or None for task in req.tasks]
+            )
+
+        def response_factory(result: Tuple[List[Optional[TaskRow]], Optional[str]]) -> CreateTasksResponse:
+            tasks, error = result
+            if error:
+                raise Exception(error)
+            # One ID per request item, 0 where no task can be returned for it
+            return CreateTasksResponse(task_ids=[task.id if task else 0 for task in tasks], error_message="")
+
+        await self._handle_request(
+            stream=stream,
+            handler=handler,
+            response_factory=response_factory
+        )
+
     async def create_task_with_user_notification(self, stream: Stream[CreateTaskWithUserNotificationRequest, CreateTaskResponse]) -> None:
         async def handler(req: CreateTaskWithUserNotificationRequest) -> Tuple[Optional[Task], Optional[str]]:
             return await self.tasks_service.create_task(
@@ -61,7 +96,8 @@ class TasksGrpcService(BaseGrpcService):
                     channel_id=req.channel_id,
                     task_type=self._task_type_from_proto(req.task_type),
                 ),
-                user_id_to_notify=req.user_id_to_notify
+                user_id_to_notify=req.user_id_to_notify,
+                idempotency_key=req.idempotency_key or None
             )
 
         def response_factory(result: Tuple[Optional[Task], Optional[str]]) -> CreateTaskResponse:
@@ -78,10 +114,98 @@ class TasksGrpcService(BaseGrpcService):
 
 
     async def get_task(self, stream: Stream[GetTaskRequest, GetTaskResponse]) -> None:
-        pass
+        async def handler(req: GetTaskRequest) -> Tuple[int, Optional[Task]]:
+            return req.task_id, await self.tasks_service.get_task(req.task_id)
+
+        def response_factory(result: Tuple[int, Optional[Task]]) -> GetTaskResponse:
+            task_id, task = result
+            if task is None:
+                return GetTaskResponse(error_message=f"Task {task_id} not found")
+            return GetTaskResponse(task=self._task_to_proto(task), error_message="")
+
+        await self._handle_request(
+            stream=stream,
+            handler=handler,
+            response_factory=response_factory
+        )
 
     async def get_channel_tasks(self, stream: Stream[GetChannelTasksRequest, GetChannelTasksResponse]) -> None:
-        pass
+        async def handler(req: GetChannelTasksRequest) -> List[Task]:
+            return await self.tasks_service.get_channel_tasks(req.channel_id)
+
+        def response_factory(tasks: List[Task]) -> GetChannelTasksResponse:
+            return GetChannelTasksResponse(tasks=[self._task_to_proto(task) for task in tasks], error_message="")
+
+        await self._handle_request(
+            stream=stream,
+            handler=handler,
+            response_factory=response_factory
+        )
+
+    async def watch_task(self, stream: Stream[WatchTaskRequest, ProtoTask]) -> None:
+        def handler(req: WatchTaskRequest) -> AsyncIterator[Union[Task, TaskStatusChange]]:
+            return self.tasks_service.watch_task(req.task_id)
+
+        await self._handle_stream_request(
+            stream=stream,
+            handler=handler,
+            response_factory=self._task_to_proto
+        )
+
+    async def watch_channel_tasks(self, stream: Stream[WatchChannelTasksRequest, ProtoTask]) -> None:
+        def handler(req: WatchChannelTasksRequest) -> AsyncIterator[Union[Task, TaskStatusChange]]:
+            return self.tasks_service.watch_channel_tasks(req.channel_id)
+
+        await self._handle_stream_request(
+            stream=stream,
+            handler=handler,
+            response_factory=self._task_to_proto
+        )
+
+    async def list_tasks(self, stream: Stream[ListTasksRequest, ListTasksResponse]) -> None:
+        def handler(req: ListTasksRequest) -> AsyncIterator[Task]:
+            task_filter = TaskFilter(
+                statuses=[TaskStatus[ProtoTaskStatus(status).name] for status in req.statuses],
+                task_types=[self._task_type_from_proto(task_type) for task_type in req.task_types],
+                channel_id=req.channel_id or None,
+                created_after=self._datetime_from_ms(req.created_after_ms),
+                created_before=self._datetime_from_ms(req.created_before_ms)
+            )
+            after = self._decode_cursor(req.after_cursor) if req.after_cursor else None
+            return self.tasks_service.list_tasks(task_filter, after=after, limit=req.limit or None)
+
+        def response_factory(task: Task) -> ListTasksResponse:
+            return ListTasksResponse(task=self._task_to_proto(task), cursor=self._encode_cursor(task))
+
+        await self._handle_stream_request(
+            stream=stream,
+            handler=handler,
+            response_factory=response_factory
+        )
+
+    def _task_to_proto(self, task: Union[Task, TaskStatusChange]) -> ProtoTask:
+        created_at = getattr(task, "created_at", None)
+        return ProtoTask(
+            task_id=task.id,
+            channel_id=task.channel_id,
+            task_type=ProtoTaskType[task.task_type.name],
+            task_status=ProtoTaskStatus[task.status.name],
+            created_at_ms=int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1000) if created_at else 0
+        )
+
+    def _datetime_from_ms(self, timestamp_ms: int) -> Optional[datetime]:
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc) if timestamp_ms else None
+
+    def _encode_cursor(self, task: Task) -> str:
+        """Opaque listing position after the task, created_at is kept with full precision"""
+        return base64.urlsafe_b64encode(f"{task.created_at.isoformat()}|{task.id}".encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> Tuple[datetime, int]:
+        try:
+            created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), int(task_id)
+        except Exception:
+            raise ValueError(f"Invalid cursor {cursor}")
 
     def _task_type_from_proto(self, task_type: int) -> TaskType:
         if task_type == 0:
@@ -0,0 +1,126 @@
+"""
+Benchmark of executor throughput against a channel-intelligence service whose capacity changes.
+
+A stub service serves a limited number of calls at once, calls beyond it queue and the service keeps working on
+calls the client already gave up on. Worker slots call it in a loop the way the asyncio worker runs revisits, taking
+the next task right after one completes, fails or is deferred. The service capacity goes through phases: healthy,
+degraded, an outage where it answers nothing, and recovered. Each client mode is run against a fresh service:
+
+    unprotected  only the per-call deadline
+    adaptive     deadline, adaptive concurrency limit and circuit breaker of BaseGrpcClient
+
+Reports calls completed per second within the deadline, failed and rejected calls and the latency of completed ones
+for every phase, waiting for a slot of the limit included, and the concurrency limit at its end.
+
+    python -m benchmarks.grpc_overload_benchmark
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from collections import Counter, defaultdict
+
+from grpclib.server import Server
+
+from benchmarks.stub_services import StubBehaviour, StubChannelIntelligence
+from infrastructure.nity.base import CallRejectedError
+from infrastructure.nity.channel_intelligence_client import ChannelIntelligenceClient, ChannelIntelligenceConfig
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=50071, help="Port of the stub service")
+    parser.add_argument("--slots", type=int, default=200, help="Worker slots calling the service at once")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Service time of one call")
+    parser.add_argument("--phases", nargs="+", default=["healthy:20:10", "degraded:5:10", "outage:0:5",
+                                                        "recovered:20:10"],
+                        help="Phases as name:capacity:seconds")
+    parser.add_argument("--deadline-seconds", type=float, default=1.0, help="Deadline of one call")
+    parser.add_argument("--task-overhead-ms", type=float, default=5,
+                        help="Time a worker slot spends on a task besides the call, e.g. status updates")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+MODES = {
+    "unprotected": {},
+    "adaptive": {
+        "max_concurrency": 200,
+        "min_concurrency": 1,
+        "initial_concurrency": 10,
+        "slow_call_seconds": args.deadline_seconds / 2,
+        "queue_timeout_seconds": args.deadline_seconds,
+        "failure_threshold": 5,
+        "breaker_reset_seconds": 2,
+    },
+}
+
+
+async def run_mode(options: dict) -> list:
+    behaviour = StubBehaviour(args.latency_ms, 0, Counter())
+    server = Server([StubChannelIntelligence(behaviour)])
+    await server.start("127.0.0.1", args.port)
+    client = ChannelIntelligenceClient(ChannelIntelligenceConfig(
+        host="127.0.0.1", port=args.port, deadline_seconds=args.deadline_seconds, **options
+    ))
+
+    phase = {"name": None}
+    outcomes = defaultdict(Counter)
+    latencies = defaultdict(list)
+    stopped = asyncio.Event()
+
+    async def slot(index: int):
+        channel_id = index
+        while not stopped.is_set():
+            name = phase["name"]
+            started = time.perf_counter()
+            try:
+                async with client.connection():
+                    await client.revisit_channel(channel_id=channel_id)
+                outcomes[name]["completed"] += 1
+                latencies[name].append(time.perf_counter() - started)
+            except CallRejectedError:
+                outcomes[name]["rejected"] += 1
+            except Exception:
+                outcomes[name]["failed"] += 1
+            channel_id += args.slots
+            await asyncio.sleep(args.task_overhead_ms / 1000)
+
+    results = []
+    slots = [asyncio.create_task(slot(index)) for index in range(args.slots)]
+    for spec in args.phases:
+        name, capacity, seconds = spec.split(":")
+        phase["name"] = name
+        behaviour.capacity = int(capacity)
+        await asyncio.sleep(float(seconds))
+        limit = client._limiter.limit if client._limiter else None
+        results.append((name, int(capacity), float(seconds), outcomes[name], latencies[name], limit))
+    stopped.set()
+    for task in slots:
+        task.cancel()
+    await asyncio.gather(*slots, return_exceptions=True)
+    await client.disconnect()
+    server.close()
+    return results
+
+
+def main():
+    logging.getLogger("infrastructure.nity").setLevel(logging.CRITICAL)
+    print(f"{args.slots} worker slots, service time {args.latency_ms:.0f}ms, deadline {args.deadline_seconds}s, "
+          f"capacity as calls served at once")
+    print(f"{'mode':>12}{'phase':>11}{'capacity':>10}{'ok/s':>8}{'max/s':>8}{'failed':>8}{'rejected':>10}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'limit':>7}")
+    for mode, options in MODES.items():
+        for name, capacity, seconds, outcome, latency, limit in asyncio.run(run_mode(options)):
+            latency = sorted(latency)
+            p50 = statistics.median(latency) * 1000 if latency else 0
+            p99 = latency[int(len(latency) * 0.99)] * 1000 if latency else 0
+            print(f"{mode:>12}{name:>11}{capacity:>10}{outcome['completed'] / seconds:>8.1f}"
+                  f"{capacity / (args.latency_ms / 1000):>8.1f}{outcome['failed']:>8}{outcome['rejected']:>10}"
+                  f"{p50:>8.0f}{p99:>8.0f}{limit if limit is not None else '-':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Local stand-ins for the external gRPC services the executor calls, for benchmarks.
+
+Both services answer after a fixed delay and fail a given share of calls with success=False, the way the real
+services report a channel they could not process or a user they could not reach. Every call is counted by method.
+With a capacity, calls beyond it wait for a free slot, and a call keeps its slot until its work is done even if the
+client gave up on it, the way an overloaded service keeps working on requests nobody waits for anymore.
+"""
+import asyncio
+import random
+from collections import Counter
+from multiprocessing import Queue
+from typing import Optional
+
+import grpclib.const
+from grpclib.server import Server
+
+from infrastructure.nity.proto.channel_intelligence import RevisitChannelRequest, RevisitChannelResponse, \
+    StartTrackingNewChannelRequest, StartTrackingNewChannelResponse
+from infrastructure.nity.proto.user_interactions import NotifyUserRequest, NotifyUserResponse
+
+
+class StubBehaviour:
+    """Delay and failure share of calls to one stub service"""
+
+    def __init__(self, latency_ms: float, error_rate: float, calls: Counter, capacity: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.calls = calls
+        self.capacity = capacity  # Calls served at once, can be changed while serving
+        self._busy = 0
+        self._freed: Optional[asyncio.Condition] = None
+
+    async def answer(self, method: str) -> bool:
+        """Wait out the latency and return whether the call succeeds"""
+        if self.capacity is None:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.shield(self._work())
+        success = random.random() >= self.error_rate
+        self.calls[f"{method}/{'ok' if success else 'error'}"] += 1
+        return success
+
+    async def _work(self) -> None:
+        if self._freed is None:
+            self._freed = asyncio.Condition()
+        async with self._freed:
+            await self._freed.wait_for(lambda: self._busy < self.capacity)
+            self._busy += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            async with self._freed:
+                self._busy -= 1
+                self._freed.notify_all()
+
+
+class StubChannelIntelligence:
+    """Answers StartTrackingNewChannel and RevisitChannel of channel_intelligence.ChannelIntelligence"""
+
+    def __init__(self, behaviour: StubBehaviour):
+        self.behaviour = behaviour
+
+    async def start_tracking_new_channel(self, stream):
+        request = await stream.recv_message()
+        success = await self.behaviour.answer("StartTrackingNewChannel")
+        await stream.send_message(
+            StartTrackingNewChannelResponse(success=success, message=f"start tracking {request.channel_id}")
+        )
+
+    async def revisit_channel(self, stream):
+        request = await stream.recv_message()
+        success = await self.behaviour.answer("RevisitChannel")
+        await stream.send_message(RevisitChannelResponse(success=success, message=f"revisit {request.channel_id}"))
+
+    def __mapping__(self):
+        return {
+            "/channel_intelligence.ChannelIntelligence/StartTrackingNewChannel": grpclib.const.Handler(
+                self.start_tracking_new_channel, grpclib.const.Cardinality.UNARY_UNARY,
+                StartTrackingNewChannelRequest, StartTrackingNewChannelResponse
+            ),
+            "/channel_intelligence.ChannelIntelligence/RevisitChannel": grpclib.const.Handler(
+                self.revisit_channel, grpclib.const.Cardinality.UNARY_UNARY,
+                RevisitChannelRequest, RevisitChannelResponse
+            ),
+        }
+
+
+class StubTelegramBot:
+    """Answers NotifyUser of user_interactions.TelegramBotService"""
+
+    def __init__(self, behaviour: StubBehaviour):
+        self.behaviour = behaviour
+
+    async def notify_user(self, stream):
+        await stream.recv_message()
+        success = await self.behaviour.answer("NotifyUser")
+        await stream.send_message(NotifyUserResponse(success=success))
+
+    def __mapping__(self):
+        return {
+            "/user_interactions.TelegramBotService/NotifyUser": grpclib.const.Handler(
+                self.notify_user, grpclib.const.Cardinality.UNARY_UNARY, NotifyUserRequest, NotifyUserResponse
+            ),
+        }
+
+
+def serve_stubs(port: int, intelligence_latency_ms: float, intelligence_error_rate: float,
+                bot_latency_ms: float, bot_error_rate: float, calls_queue: Optional[Queue] = None) -> None:
+    """
+    Serve both stub services on one port until terminated, meant as a multiprocessing target.
+    Call counts are put on calls_queue every second.
+    """
+    calls = Counter()
+
+    async def serve():
+        server = Server([
+            StubChannelIntelligence(StubBehaviour(intelligence_latency_ms, intelligence_error_rate, calls)),
+            StubTelegramBot(StubBehaviour(bot_latency_ms, bot_error_rate, calls)),
+        ])
+        await server.start("127.0.0.1", port)
+        while True:
+            await asyncio.sleep(1)
+            if calls_queue is not None:
+                calls_queue.put(dict(calls))
+
+    asyncio.run(serve())
@@ -0,0 +1,6 @@
+class NotFoundError(Exception):
+    """Requested task does not exist"""
+
+
+class UnavailableError(Exception):
+    """Something the request depends on is temporarily down, the client may retry"""
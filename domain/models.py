@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Optional, List
 
 from pydantic import BaseModel, ConfigDict
 
@@ -11,6 +11,7 @@ class TaskStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    DEAD_LETTERED = "dead_lettered"  # Failed on every attempt, not retried any more
 
 
 class TaskType(str, Enum):
@@ -40,6 +41,24 @@ class Task(TaskBase):
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
     user_id_to_notify: Optional[int] = None
+    attempts: int = 0
+
+
+class TaskStatusChange(BaseModel):
+    """Status of a task as published by the tasks table on every change"""
+    id: int
+    channel_id: int
+    task_type: TaskType
+    status: TaskStatus
+
+
+class TaskFilter(BaseModel):
+    """Task listing filter, empty fields do not restrict the listing"""
+    statuses: List[TaskStatus] = []
+    task_types: List[TaskType] = []
+    channel_id: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
 
 
 class TrackedChannel(BaseModel):
@@ -50,3 +69,4 @@ class TrackedChannel(BaseModel):
     revisiting: bool
     last_revisited: Optional[datetime] = None
     created_at: datetime
+    next_revisit_at: Optional[datetime] = None
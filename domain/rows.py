@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from domain.models import TaskStatus, TaskType
+
+
+@dataclass(slots=True)
+class TaskRow:
+    """
+    Task as read by internal callers, built straight from a result row without validation.
+    Has the same attributes as domain.models.Task, field order matches the selected columns.
+    """
+    id: int
+    message_id: str
+    task_type: TaskType
+    channel_id: int
+    status: TaskStatus
+    created_at: datetime
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    error_message: Optional[str]
+    user_id_to_notify: Optional[int]
+    attempts: int
+
+
+@dataclass(slots=True)
+class TrackedChannelRow:
+    """Tracked channel as read by internal callers, same attributes as domain.models.TrackedChannel"""
+    id: int
+    channel_id: int
+    revisiting: bool
+    last_revisited: Optional[datetime]
+    created_at: datetime
+    next_revisit_at: Optional[datetime]
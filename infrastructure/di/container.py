@@ -1,7 +1,7 @@
 from injector import Injector
 
 from .modules import RepositoriesModule, GrpcModule, ServicesModule, RabbitMqModule, \
-    TasksMiddlewareModule, GrpcClientsModule
+    TasksMiddlewareModule, GrpcClientsModule, WorkerModule
 
 
 def get_container() -> Injector:
@@ -10,7 +10,8 @@ def get_container() -> Injector:
         ServicesModule(),
         RabbitMqModule(),
         TasksMiddlewareModule(),
-        GrpcModule()
+        GrpcModule(),
+        GrpcClientsModule()
     ])
 
 
@@ -19,5 +20,6 @@ def get_worker_container() -> Injector:
         RepositoriesModule(),
         RabbitMqModule(),
         TasksMiddlewareModule(),
-        GrpcClientsModule()
+        GrpcClientsModule(),
+        WorkerModule()
     ])
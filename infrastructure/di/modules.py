@@ -6,9 +6,16 @@ from api.service import TasksGrpcService
 from config import settings
 from infrastructure.nity.channel_intelligence_client import ChannelIntelligenceConfig, ChannelIntelligenceClient
 from infrastructure.nity.telegram_bot_client import TelegramBotClientConfig, TelegramBotClient
-from infrastructure.pg_repositories.tasks_repository import TasksRepository
-from infrastructure.pg_repositories.tracked_channels_repository import TrackedChannelsRepository
+from infrastructure.pg_repositories.task_outbox_repository import TaskOutboxRepository
+from infrastructure.pg_repositories.tasks_archive_repository import TasksArchiveRepository
+from infrastructure.pg_repositories.tasks_repository import TasksRepository, AsyncTasksRepository
+from infrastructure.pg_repositories.tracked_channels_repository import TrackedChannelsRepository, \
+    AsyncTrackedChannelsRepository
+from infrastructure.pg_repositories.user_notifications_repository import UserNotificationsRepository
 from infrastructure.rabbitmq.broker_client import BrokerClient
+from services.lease_heartbeat import TaskLeaseHeartbeat
+from services.status_buffer import TaskStatusBuffer
+from services.task_status_feed import TaskStatusFeed
 from services.tasks_service import TasksService
 
 
@@ -23,8 +30,14 @@ class ServicesModule(Module):
 
     @provider
     @singleton
-    def provide_tasks_service(self, tasks_repository: TasksRepository) -> TasksService:
-        return TasksService(tasks_repository)
+    def provide_task_status_feed(self) -> TaskStatusFeed:
+        return TaskStatusFeed()
+
+    @provider
+    @singleton
+    def provide_tasks_service(self, tasks_repository: AsyncTasksRepository,
+                              status_feed: TaskStatusFeed) -> TasksService:
+        return TasksService(tasks_repository, status_feed)
 
 
 class RepositoriesModule(Module):
@@ -39,6 +52,31 @@ class RepositoriesModule(Module):
     def provide_tracked_channels_repository(self) -> TrackedChannelsRepository:
         return TrackedChannelsRepository()
 
+    @provider
+    @singleton
+    def provide_tasks_archive_repository(self) -> TasksArchiveRepository:
+        return TasksArchiveRepository()
+
+    @provider
+    @singleton
+    def provide_task_outbox_repository(self) -> TaskOutboxRepository:
+        return TaskOutboxRepository()
+
+    @provider
+    @singleton
+    def provide_user_notifications_repository(self) -> UserNotificationsRepository:
+        return UserNotificationsRepository()
+
+    @provider
+    @singleton
+    def provide_async_tasks_repository(self) -> AsyncTasksRepository:
+        return AsyncTasksRepository()
+
+    @provider
+    @singleton
+    def provide_async_tracked_channels_repository(self) -> AsyncTrackedChannelsRepository:
+        return AsyncTrackedChannelsRepository()
+
 
 class GrpcModule(Module):
 
@@ -65,7 +103,16 @@ class GrpcClientsModule(Module):
     def provide_channel_intelligence_config(self) -> ChannelIntelligenceConfig:
         return ChannelIntelligenceConfig(
             host=settings.CHANNEL_INTELLIGENCE_GRPC_HOST,
-            port=settings.CHANNEL_INTELLIGENCE_GRPC_PORT
+            port=settings.CHANNEL_INTELLIGENCE_GRPC_PORT,
+            pool_size=settings.GRPC_CLIENT_POOL_SIZE,
+            deadline_seconds=settings.CHANNEL_INTELLIGENCE_DEADLINE_SECONDS,
+            max_concurrency=settings.CHANNEL_INTELLIGENCE_MAX_CONCURRENCY,
+            min_concurrency=settings.CHANNEL_INTELLIGENCE_MIN_CONCURRENCY,
+            initial_concurrency=settings.CHANNEL_INTELLIGENCE_INITIAL_CONCURRENCY,
+            slow_call_seconds=settings.CHANNEL_INTELLIGENCE_SLOW_CALL_SECONDS,
+            queue_timeout_seconds=settings.CHANNEL_INTELLIGENCE_QUEUE_TIMEOUT_SECONDS,
+            failure_threshold=settings.CHANNEL_INTELLIGENCE_FAILURE_THRESHOLD,
+            breaker_reset_seconds=settings.CHANNEL_INTELLIGENCE_BREAKER_RESET_SECONDS
         )
 
     @provider
@@ -81,7 +128,9 @@ class GrpcClientsModule(Module):
     def provide_telegram_bot_config(self) -> TelegramBotClientConfig:
         return TelegramBotClientConfig(
             host=settings.TELEGRAM_BOT_GRPC_HOST,
-            port=settings.TELEGRAM_BOT_GRPC_PORT
+            port=settings.TELEGRAM_BOT_GRPC_PORT,
+            pool_size=settings.GRPC_CLIENT_POOL_SIZE,
+            deadline_seconds=settings.TELEGRAM_BOT_DEADLINE_SECONDS
         )
 
     @provider
@@ -93,6 +142,30 @@ class GrpcClientsModule(Module):
         return TelegramBotClient(config)
 
 
+class WorkerModule(Module):
+
+    @provider
+    @singleton
+    def provide_task_status_buffer(self, tasks_repository: TasksRepository,
+                                   tracked_channels_repository: TrackedChannelsRepository) -> TaskStatusBuffer:
+        return TaskStatusBuffer(
+            tasks_repository=tasks_repository,
+            tracked_channels_repository=tracked_channels_repository,
+            flush_interval_ms=settings.STATUS_BUFFER_FLUSH_INTERVAL_MS,
+            max_events=settings.STATUS_BUFFER_MAX_EVENTS,
+            fallback_file=settings.STATUS_BUFFER_FALLBACK_FILE,
+            revisit_interval_minutes=settings.REVISIT_INTERVAL_MINUTES
+        )
+
+    @provider
+    @singleton
+    def provide_task_lease_heartbeat(self, tasks_repository: TasksRepository) -> TaskLeaseHeartbeat:
+        return TaskLeaseHeartbeat(
+            tasks_repository=tasks_repository,
+            interval_seconds=settings.TASK_HEARTBEAT_INTERVAL_SECONDS
+        )
+
+
 class TasksMiddlewareModule(Module):
 
     @provider
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from config import settings
+from infrastructure.pg_repositories.engine import engine
+from infrastructure.pg_repositories.schema import ensure_database, ensure_schema
+from infrastructure.rabbitmq.broker_client import BrokerClient
+from utils.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Key of the Postgres advisory lock held while the schema is migrated
+MIGRATION_LOCK_KEY = 7_346_120_001
+
+
+@contextmanager
+def migration_lock():
+    """
+    Hold a session level advisory lock, processes starting at the same time migrate one after another.
+    The connection is in autocommit mode, CREATE INDEX CONCURRENTLY would wait for a transaction open on it.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def migrate() -> None:
+    """
+    Create the database and RabbitMQ vhost if missing and bring the schema up to date. Safe to run repeatedly
+    and from several processes at once.
+    """
+    ensure_database()
+    with migration_lock():
+        ensure_schema()
+    if settings.BROKER_BACKEND == "rabbitmq":
+        BrokerClient().ensure_vhost()
+    logger.info("Migrations applied")
+
+
+def migrate_on_startup() -> None:
+    """Run migrations when processes manage them on start, see AUTO_MIGRATE"""
+    if settings.AUTO_MIGRATE:
+        migrate()
+    else:
+        logger.info("AUTO_MIGRATE is off, expecting migrations to be applied by main_migrate.py")
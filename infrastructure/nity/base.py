@@ -1,10 +1,24 @@
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
+from collections import deque
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Generic, TypeVar, Optional
+from typing import Generic, TypeVar, Optional, List, Coroutine, Any, Callable, Awaitable, Deque, Tuple
 
 from betterproto import ServiceStub
 from grpclib.client import Channel
+from grpclib.const import Status
+from grpclib.exceptions import StreamTerminatedError, GRPCError
+
+from utils.logger import AppLogger
+from utils.metrics import GRPC_CLIENT_CONCURRENCY_LIMIT, GRPC_CLIENT_REJECTED_CALLS
+
+logger = AppLogger.get_logger(__name__)
 
 
 @dataclass
@@ -12,16 +26,260 @@ class GrpcClientConfig:
     host: str
     port: int
     max_message_size_mb: int = 50
+    pool_size: int = 2  # HTTP/2 channels kept open per event loop
+    deadline_seconds: Optional[float] = None  # Deadline of every call, also sent to the server
+    # Calls in flight per process are limited when max_concurrency is set, the limit adapts between min and max
+    max_concurrency: Optional[int] = None
+    min_concurrency: int = 1
+    initial_concurrency: int = 10
+    slow_call_seconds: Optional[float] = None  # Calls taking longer shrink the limit like overload errors
+    queue_timeout_seconds: Optional[float] = None  # Wait for a free slot before the call is rejected
+    # Consecutive overload errors opening the circuit breaker, 0 turns it off
+    failure_threshold: int = 0
+    breaker_reset_seconds: float = 30
 
 
 TStub = TypeVar('TStub', bound=ServiceStub)
+TResult = TypeVar('TResult')
+
+# Errors after which a channel is checked and replaced if its connection is gone
+CONNECTION_ERRORS = (ConnectionError, OSError, StreamTerminatedError)
+
+# Errors meaning the service is overloaded or down. They shrink the concurrency limit and count towards opening
+# the circuit breaker, other errors are answers of a working service.
+OVERLOAD_STATUSES = {Status.UNAVAILABLE, Status.DEADLINE_EXCEEDED, Status.RESOURCE_EXHAUSTED}
+
+_thread_local = threading.local()
+
+
+def is_overload_error(error: BaseException) -> bool:
+    if isinstance(error, GRPCError):
+        return error.status in OVERLOAD_STATUSES
+    return isinstance(error, (asyncio.TimeoutError,) + CONNECTION_ERRORS)
+
+
+class CallRejectedError(Exception):
+    """Call was not made to spare an overloaded or failing service, it can be made again after retry_after seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(CallRejectedError):
+    pass
+
+
+class ConcurrencyLimitError(CallRejectedError):
+    pass
+
+
+def run_in_thread_loop(coro: Coroutine[Any, Any, TResult]) -> TResult:
+    """
+    Run coroutine on the event loop of the calling thread.
+    The loop lives as long as the thread, so channels opened on it are reused by the following calls.
+    """
+    loop = getattr(_thread_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_local.loop = loop
+    return loop.run_until_complete(coro)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits calls in flight across all threads and event loops of a process. The limit adapts with AIMD: it grows by
+    one for every limit calls completing in time while it is in use, and is cut by backoff_ratio when a call fails
+    with an overload error or takes longer than slow_call_seconds. Calls that started before the last cut don't cut
+    it again, so a burst of timeouts counts once.
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int,
+                 slow_call_seconds: Optional[float] = None, backoff_ratio: float = 0.5):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.slow_call_seconds = slow_call_seconds
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._last_cut = 0.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+        GRPC_CLIENT_CONCURRENCY_LIMIT.labels(client=name).set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Take a slot and return the monotonic time it was taken at, waiting up to timeout seconds for one.
+        Raises ConcurrencyLimitError when no slot frees up in time.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight < self.limit:
+                self._in_flight += 1
+                return time.monotonic()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return time.monotonic()
+        except BaseException as e:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                elif waiter.done() and not waiter.cancelled():
+                    # Slot reached the waiter as it gave up
+                    self._in_flight -= 1
+                    self._wake_waiters()
+                else:
+                    # Slot is on its way, _grant gives it back
+                    waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise ConcurrencyLimitError(
+                    f"No free slot of {self.limit} for calls to {self.name} within {timeout}s", timeout or 0
+                ) from None
+            raise
+
+    def release(self, started: float, overloaded: Optional[bool]) -> None:
+        """Give back a slot taken at started and adapt the limit, overloaded is None for calls without an outcome"""
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if overloaded is not None:
+                slow = self.slow_call_seconds is not None and now - started > self.slow_call_seconds
+                if overloaded or slow:
+                    if started >= self._last_cut:
+                        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                        self._last_cut = now
+                        GRPC_CLIENT_CONCURRENCY_LIMIT.labels(client=self.name).set(self.limit)
+                elif (self._in_flight + 1) * 2 >= self._limit:
+                    self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                    GRPC_CLIENT_CONCURRENCY_LIMIT.labels(client=self.name).set(self.limit)
+            self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """Hand free slots over to waiters in arrival order, the lock is held by the caller"""
+        while self._waiters and self._in_flight < self.limit:
+            loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._grant, waiter)
+            except RuntimeError:
+                # Loop of the waiter is closed
+                continue
+            self._in_flight += 1
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # Waiter gave up before the slot reached it
+            self.release(time.monotonic(), None)
+        else:
+            waiter.set_result(None)
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast once failure_threshold calls in a row failed with overload errors. After reset_seconds a single
+    trial call is let through, the breaker closes if it succeeds and stays open for another reset_seconds otherwise.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Return whether the call is the trial of an open breaker, raises CircuitOpenError if it may not go through"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            retry_after = self._opened_at + self.reset_seconds - time.monotonic()
+            if retry_after <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError(f"Circuit breaker of {self.name} is open", max(retry_after, self.reset_seconds / 10))
+
+    def record(self, success: Optional[bool], trial: bool) -> None:
+        """Record the outcome of a call let through, None for calls that ended without one"""
+        with self._lock:
+            if trial:
+                self._trial_in_flight = False
+            if success is None:
+                return
+            if success:
+                if self._opened_at is not None and trial:
+                    logger.info(f"Circuit breaker of {self.name} closed")
+                    self._opened_at = None
+                self._failures = 0
+                return
+            self._failures += 1
+            if trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    logger.warning(f"Circuit breaker of {self.name} opened after {self._failures} failed calls")
+                self._opened_at = time.monotonic()
+
+
+class _ChannelPool(Generic[TStub]):
+    """Channels bound to one event loop, handed out round-robin"""
+
+    def __init__(self, config: GrpcClientConfig, stub_class: type[TStub]):
+        self.config = config
+        self.stub_class = stub_class
+        self._channels: List[Optional[Channel]] = [None] * max(1, config.pool_size)
+        self._stubs: List[Optional[TStub]] = [None] * len(self._channels)
+        self._next = itertools.cycle(range(len(self._channels)))
+
+    def stub(self) -> TStub:
+        index = next(self._next)
+        # Channels connect lazily on the first request and reconnect after the connection is lost
+        if self._channels[index] is None:
+            channel = Channel(host=self.config.host, port=self.config.port)
+            self._channels[index] = channel
+            self._stubs[index] = self.stub_class(channel, timeout=self.config.deadline_seconds)
+        return self._stubs[index]
+
+    def discard_broken(self) -> None:
+        """Close channels without a live connection, they are reopened on demand"""
+        for index, channel in enumerate(self._channels):
+            if channel is not None and not channel._connected:
+                channel.close()
+                self._channels[index] = None
+                self._stubs[index] = None
+
+    def close(self) -> None:
+        for index, channel in enumerate(self._channels):
+            if channel is not None:
+                channel.close()
+            self._channels[index] = None
+            self._stubs[index] = None
 
 
 class BaseGrpcClient(ABC, Generic[TStub]):
     def __init__(self, config: GrpcClientConfig):
         self.config = config
-        self._channel: Optional[Channel] = None
-        self._stub: Optional[TStub] = None
+        # Channels can only be used on the loop they were created on, so every loop gets its own pool
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ChannelPool[TStub]]" = \
+            weakref.WeakKeyDictionary()
+        self._pools_lock = threading.Lock()
+        # Stub taken by the innermost connection() of the current task, so its calls go through one channel
+        self._current_stub: contextvars.ContextVar[Optional[TStub]] = contextvars.ContextVar(
+            f"{type(self).__name__}_stub", default=None
+        )
+        name = type(self).__name__
+        self._limiter = AdaptiveConcurrencyLimiter(
+            name, config.initial_concurrency, config.min_concurrency, config.max_concurrency,
+            config.slow_call_seconds
+        ) if config.max_concurrency else None
+        self._breaker = CircuitBreaker(
+            name, config.failure_threshold, config.breaker_reset_seconds
+        ) if config.failure_threshold > 0 else None
 
     @property
     @abstractmethod
@@ -29,36 +287,80 @@ class BaseGrpcClient(ABC, Generic[TStub]):
         """Return the betterproto stub class"""
         pass
 
+    def _pool(self) -> _ChannelPool[TStub]:
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = _ChannelPool(self.config, self.stub_class)
+                self._pools[loop] = pool
+            return pool
+
+    def run(self, coro: Coroutine[Any, Any, TResult]) -> TResult:
+        """Run coroutine using this client from synchronous code, see run_in_thread_loop"""
+        return run_in_thread_loop(coro)
+
     async def connect(self) -> None:
-        """Establish connection to the gRPC server"""
-        if self._channel is None:
-            self._channel = Channel(
-                host=self.config.host,
-                port=self.config.port,
-            )
-            self._stub = self.stub_class(self._channel)
+        """Open the channel pool for the current event loop"""
+        self._pool()
 
     async def disconnect(self) -> None:
-        """Close the gRPC channel"""
-        if self._channel is not None:
-            self._channel.close()
-            self._channel = None
-            self._stub = None
+        """Close channels of the current event loop"""
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            pool = self._pools.pop(loop, None)
+        if pool is not None:
+            pool.close()
+
+    async def call(self, request: Callable[[], Awaitable[TResult]]) -> TResult:
+        """
+        Make a call through the circuit breaker and the concurrency limiter, request starts the call on the stub.
+        Raises CallRejectedError without calling when the breaker is open or no slot of the limit frees up in time.
+        """
+        name = type(self).__name__
+        try:
+            trial = self._breaker.before_call() if self._breaker is not None else False
+            try:
+                started = await self._limiter.acquire(self.config.queue_timeout_seconds) if self._limiter else None
+            except BaseException:
+                if self._breaker is not None:
+                    self._breaker.record(None, trial)
+                raise
+        except CallRejectedError as e:
+            GRPC_CLIENT_REJECTED_CALLS.labels(
+                client=name, reason="circuit_open" if isinstance(e, CircuitOpenError) else "concurrency_limit"
+            ).inc()
+            raise
+
+        overloaded = None
+        try:
+            result = await request()
+            overloaded = False
+            return result
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            if self._limiter is not None:
+                self._limiter.release(started, overloaded)
+            if self._breaker is not None:
+                self._breaker.record(None if overloaded is None else not overloaded, trial)
 
     @asynccontextmanager
     async def connection(self):
-        """Context manager for handling connections"""
-        await self.connect()
+        """Context manager providing a pooled stub. Channels stay open after it exits."""
+        pool = self._pool()
+        stub = pool.stub()
+        token = self._current_stub.set(stub)
         try:
-            yield self._stub
-        except Exception as e:
-            print(e)
-            raise e
+            yield stub
+        except CONNECTION_ERRORS as e:
+            logger.warning(f"Connection to {self.config.host}:{self.config.port} failed: {str(e)}")
+            pool.discard_broken()
+            raise
         finally:
-            await self.disconnect()
+            self._current_stub.reset(token)
 
     @property
     def stub(self) -> TStub:
-        if self._stub is None:
-            raise RuntimeError("Client not connected")
-        return self._stub
+        return self._current_stub.get() or self._pool().stub()
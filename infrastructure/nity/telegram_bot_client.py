@@ -20,10 +20,10 @@ class TelegramBotClient(BaseGrpcClient):
 
     async def notify_nity_user(self, nity_user_id: int, message: str) -> bool:
         try:
-            response: NotifyUserResponse = await self.stub.notify_user(
+            response: NotifyUserResponse = await self.call(lambda: self.stub.notify_user(
                 user_id=nity_user_id,
                 message=message
-            )
+            ))
             return response.success
         except Exception as e:
             logger.error(f"Error in notify_user: {str(e)}")
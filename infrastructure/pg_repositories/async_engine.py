@@ -0,0 +1,54 @@
+import os
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import settings
+from utils.logger import AppLogger
+from utils.metrics import DB_POOL_CHECKOUT_SECONDS
+
+logger = AppLogger.get_logger(__name__)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool reporting how long checkouts waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool="async").observe(time.perf_counter() - started)
+
+
+# Same database as the sync engine, but through asyncpg so queries don't block the event loop
+async_engine = create_async_engine(
+    make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=0,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True
+)
+
+# Entities are not expired on commit, so returned objects can be read without another round-trip
+AsyncSessionFactory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+# Same as the sync engine, forked processes open their own connections
+os.register_at_fork(after_in_child=lambda: async_engine.sync_engine.dispose(close=False))
+
+
+@asynccontextmanager
+async def get_async_session():
+    session: AsyncSession = AsyncSessionFactory()
+    try:
+        yield session
+    except:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
@@ -1,21 +1,49 @@
+import os
+import time
 from contextlib import contextmanager
+from datetime import timezone
 
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, DateTime, TypeDecorator
+from sqlalchemy.pool import QueuePool
 from config import settings
-from sqlalchemy_utils import database_exists, create_database
 
 from utils.logger import AppLogger
+from utils.metrics import DB_POOL_CHECKOUT_SECONDS
 
 logger = AppLogger.get_logger(__name__)
 
 Base = declarative_base()
 
-if not database_exists(settings.DATABASE_URL):
-        create_database(settings.DATABASE_URL)
+
+class UtcDateTime(TypeDecorator):
+    """
+    Timestamp without time zone that holds UTC time.
+    Aware datetimes are converted to naive UTC before binding, asyncpg refuses to bind them to such columns.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool reporting how long checkouts waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool="sync").observe(time.perf_counter() - started)
+
 
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_size=20,
     max_overflow=0,
     pool_timeout=30,
@@ -25,6 +53,10 @@ engine = create_engine(
 
 Session = sessionmaker(bind=engine)
 
+# Worker processes are forked from a parent that may have used the engine already, connections are not shared
+# across processes, so children drop inherited ones without closing them under the parent and open their own
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
 logger.info(f"Database connection established: {settings.DATABASE_URL}")
 
 @contextmanager
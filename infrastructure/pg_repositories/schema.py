@@ -0,0 +1,226 @@
+import importlib
+import re
+
+from sqlalchemy import inspect, text, Enum
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex, Index
+from sqlalchemy_utils import database_exists, create_database
+
+from config import settings
+from infrastructure.pg_repositories.engine import Base, engine
+from utils.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Modules declaring entities. They are imported before the schema is checked, so the migration covers every table
+# no matter which repositories the calling process uses
+ENTITY_MODULES = [
+    "infrastructure.pg_repositories.task_outbox_repository",
+    "infrastructure.pg_repositories.tasks_repository",
+    "infrastructure.pg_repositories.tasks_archive_repository",
+    "infrastructure.pg_repositories.tracked_channels_repository",
+    "infrastructure.pg_repositories.user_notifications_repository",
+]
+
+# Data fixes for columns added to existing tables, by table name. Each statement has to be safe to run on every start.
+BACKFILLS = {
+    "tracked_channels": [
+        text("""
+            UPDATE tracked_channels
+            SET next_revisit_at = COALESCE(last_revisited, created_at) + make_interval(mins => :interval_minutes)
+            WHERE next_revisit_at IS NULL
+        """).bindparams(interval_minutes=settings.REVISIT_INTERVAL_MINUTES),
+    ],
+    "tasks": [
+        # Active tasks of a channel and type have to be unique before ux_tasks_active_channel_id_task_type is built,
+        # the running one or else the oldest one is kept
+        text("""
+            UPDATE tasks
+            SET status = 'CANCELLED', completed_at = now() AT TIME ZONE 'utc',
+                error_message = 'Duplicate of an active task of the channel'
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY channel_id, task_type ORDER BY status = 'RUNNING' DESC, id
+                    ) AS position
+                    FROM tasks
+                    WHERE status IN ('PENDING', 'RUNNING')
+                ) active
+                WHERE position > 1
+            )
+        """),
+    ],
+}
+
+# Indexes no longer declared on any entity, dropped by the migration
+OBSOLETE_INDEXES = [
+    "ix_tracked_channels_revisiting_last_revisited",
+    # Covered by ux_tasks_active_channel_id_task_type
+    "ix_tasks_active_status",
+]
+
+# Channel the tasks table notifies on status changes, payload is JSON with id, channel_id, task_type and status
+TASK_STATUS_CHANNEL = "task_status"
+
+# Channel the task_outbox table notifies once per insert statement, wakes the outbox relay up
+TASK_OUTBOX_CHANNEL = "task_outbox"
+
+# Triggers by table name, created after backfills. Each statement has to be safe to run on every start.
+TRIGGERS = {
+    "tasks": [
+        text(f"""
+            CREATE OR REPLACE FUNCTION notify_task_status() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+                    RETURN NULL;
+                END IF;
+                PERFORM pg_notify('{TASK_STATUS_CHANNEL}', json_build_object(
+                    'id', NEW.id,
+                    'channel_id', NEW.channel_id,
+                    'task_type', NEW.task_type,
+                    'status', NEW.status
+                )::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """),
+        text("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tasks_notify_status') THEN
+                    CREATE TRIGGER tasks_notify_status
+                    AFTER INSERT OR UPDATE OF status ON tasks
+                    FOR EACH ROW EXECUTE FUNCTION notify_task_status();
+                END IF;
+            END
+            $$
+        """),
+    ],
+    "task_outbox": [
+        text(f"""
+            CREATE OR REPLACE FUNCTION notify_task_outbox() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{TASK_OUTBOX_CHANNEL}', '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """),
+        text("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'task_outbox_notify') THEN
+                    CREATE TRIGGER task_outbox_notify
+                    AFTER INSERT ON task_outbox
+                    FOR EACH STATEMENT EXECUTE FUNCTION notify_task_outbox();
+                END IF;
+            END
+            $$
+        """),
+    ],
+}
+
+
+def ensure_database() -> None:
+    """Create the database if it does not exist"""
+    if database_exists(settings.DATABASE_URL):
+        return
+    try:
+        create_database(settings.DATABASE_URL)
+        logger.info("Created database")
+    except Exception:
+        # Another process starting at the same time may have created it first
+        if not database_exists(settings.DATABASE_URL):
+            raise
+
+
+def ensure_schema() -> None:
+    """
+    Create missing tables, columns, indexes and triggers.
+    create_all neither alters existing tables nor creates indexes for them, so columns and indexes declared
+    on already existing tables are added separately.
+    """
+    for module in ENTITY_MODULES:
+        importlib.import_module(module)
+    Base.metadata.create_all(engine)
+    # New enum values cannot be used in the transaction that adds them, so they are committed first
+    with engine.begin() as conn:
+        _add_missing_enum_values(conn)
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        for statements_by_table in (BACKFILLS, TRIGGERS):
+            for table_name, statements in statements_by_table.items():
+                if table_name in Base.metadata.tables:
+                    for statement in statements:
+                        conn.execute(statement)
+    _create_missing_indexes()
+    logger.info("Database schema is up to date")
+
+
+def _create_missing_indexes() -> None:
+    """
+    Build indexes declared on existing tables with CREATE INDEX CONCURRENTLY, so writes to the table go on while
+    it is built. It cannot run in a transaction, so the connection is in autocommit mode. A build that was
+    interrupted leaves an invalid index behind, it is dropped and built again. OBSOLETE_INDEXES are dropped.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        existing_indexes = dict(conn.execute(text(
+            "SELECT relname, indisvalid FROM pg_index JOIN pg_class ON pg_class.oid = indexrelid "
+            "WHERE relnamespace = current_schema()::regnamespace"
+        )).all())
+        for table in Base.metadata.sorted_tables:
+            # Indexes of partitioned tables cannot be built concurrently
+            concurrently = table.dialect_options["postgresql"]["partition_by"] is None
+            for index in table.indexes:
+                if existing_indexes.get(index.name) is False:
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+                    logger.warning(f"Dropped invalid index {index.name}")
+                elif index.name in existing_indexes:
+                    continue
+                conn.execute(text(_create_index_sql(conn, index, concurrently)))
+                logger.info(f"Created index {index.name}")
+        for name in OBSOLETE_INDEXES:
+            if name in existing_indexes:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                logger.info(f"Dropped index {name}")
+
+
+def _create_index_sql(conn: Connection, index: Index, concurrently: bool) -> str:
+    sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect)).strip()
+    if concurrently:
+        sql = re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", sql)
+    return sql
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            # Existing rows get the server default, other columns are added as NULL
+            default = f" DEFAULT {column.server_default.arg.text}" if column.server_default is not None else ""
+            conn.execute(text(
+                f'ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {column.name} {column_type}{default}'
+            ))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _add_missing_enum_values(conn: Connection) -> None:
+    """Add members of Python enums declared after the Postgres enum type was created. Enum columns store names."""
+    enum_types = {
+        column.type.name: column.type
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, Enum) and column.type.name
+    }
+    for name, enum_type in enum_types.items():
+        existing_values = set(conn.execute(
+            text("SELECT enumlabel FROM pg_enum JOIN pg_type ON pg_type.oid = enumtypid WHERE typname = :name"),
+            {"name": name}
+        ).scalars())
+        for value in enum_type.enums:
+            if value not in existing_values:
+                conn.execute(text(f"ALTER TYPE {name} ADD VALUE IF NOT EXISTS '{value}'"))
+                logger.info(f"Added value {value} to enum {name}")
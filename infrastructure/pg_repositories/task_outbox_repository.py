@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, BigInteger, String, LargeBinary, Index, select, delete, insert, Row
+from sqlalchemy.orm import Session
+
+from infrastructure.pg_repositories.engine import Base, UtcDateTime
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+
+class TaskOutboxEntity(Base):
+    """Broker messages of created tasks waiting to be published, written in the same transaction as the tasks"""
+    __tablename__ = 'task_outbox'
+
+    id = Column(BigInteger, primary_key=True)
+    message_id = Column(String, nullable=False)
+    message = Column(LargeBinary, nullable=False)  # Encoded Dramatiq message
+    available_at = Column(UtcDateTime, nullable=False, default=TimeUtils.current_datetime)  # Not published before
+    created_at = Column(UtcDateTime, nullable=False, default=TimeUtils.current_datetime)
+
+    __table_args__ = (
+        # Due messages lookup in claim_due_messages
+        Index('ix_task_outbox_available_at_id', 'available_at', 'id'),
+    )
+
+
+class TaskOutboxRepository:
+    def add_messages(self, session: Session, messages: List[dict]) -> None:
+        """
+        Add messages and commit, together with whatever the caller changed in the session.
+        Each item holds message_id, message and optionally available_at.
+        """
+        try:
+            if messages:
+                now = TimeUtils.current_datetime()
+                session.execute(insert(TaskOutboxEntity.__table__), [
+                    {"available_at": now, "created_at": now, **message} for message in messages
+                ])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to add outbox messages: {str(e)}")
+            raise
+
+    def claim_due_messages(self, session: Session, due_before: datetime, limit: int) -> List[Row]:
+        """
+        Lock up to limit messages available before given time, oldest first, and return rows of (id, message).
+        Rows stay locked until delete_messages commits, messages locked by another relay are skipped.
+        """
+        stmt = select(TaskOutboxEntity.id, TaskOutboxEntity.message).where(
+            TaskOutboxEntity.available_at <= due_before
+        ).order_by(
+            TaskOutboxEntity.available_at, TaskOutboxEntity.id
+        ).limit(limit).with_for_update(skip_locked=True)
+        return list(session.execute(stmt).all())
+
+    def delete_messages(self, session: Session, ids: List[int]) -> None:
+        """Delete published messages and release the claim"""
+        try:
+            if ids:
+                session.execute(delete(TaskOutboxEntity).where(TaskOutboxEntity.id.in_(ids)))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to delete published outbox messages: {str(e)}")
+            raise
@@ -0,0 +1,169 @@
+import gzip
+import os
+import re
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Column, Integer, String, Enum as SQLEnum, BigInteger, Index, select, delete, insert, func, \
+    text
+from sqlalchemy.orm import Session
+
+from domain.models import TaskStatus, TaskType
+from infrastructure.pg_repositories.engine import Base, UtcDateTime, engine
+from infrastructure.pg_repositories.tasks_repository import TaskEntity
+from utils.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+PARTITION_NAME_PATTERN = re.compile(r"^tasks_archive_p(\d{4})(\d{2})$")
+
+
+class TaskArchiveEntity(Base):
+    """Finished tasks moved out of the tasks table, partitioned by month of created_at"""
+    __tablename__ = 'tasks_archive'
+
+    # Primary key of a partitioned table has to include the partition key
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(UtcDateTime, primary_key=True)
+    message_id = Column(String, nullable=False)
+    task_type = Column(SQLEnum(TaskType), nullable=False)
+    channel_id = Column(BigInteger, nullable=False)
+    status = Column(SQLEnum(TaskStatus), nullable=False)
+    started_at = Column(UtcDateTime, nullable=True)
+    completed_at = Column(UtcDateTime, nullable=True)
+    error_message = Column(String, nullable=True)
+    user_id_to_notify = Column(BigInteger, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+
+    __table_args__ = (
+        Index('ix_tasks_archive_channel_id', 'channel_id'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"tasks_archive_p{month.year:04d}{month.month:02d}"
+
+
+class TasksArchiveRepository:
+    def archive_finished_tasks(self, session: Session, created_before: datetime, statuses: List[TaskStatus],
+                               limit: int) -> int:
+        """
+        Move up to limit tasks in given statuses created before given time from tasks to tasks_archive.
+        Rows are deleted and inserted by one statement, so a task is never in both tables or in neither.
+        Rows locked by concurrent movers are skipped.
+        """
+        try:
+            oldest = session.scalar(
+                select(func.min(TaskEntity.created_at)).where(
+                    TaskEntity.status.in_(statuses), TaskEntity.created_at < created_before
+                )
+            )
+            if oldest is None:
+                return 0
+            self._create_partitions(session, oldest, created_before)
+
+            columns = [column.name for column in TaskArchiveEntity.__table__.columns]
+            tasks = TaskEntity.__table__
+            movable = select(tasks.c.id).where(
+                tasks.c.status.in_(statuses), tasks.c.created_at < created_before
+            ).limit(limit).with_for_update(skip_locked=True)
+            moved = delete(tasks).where(tasks.c.id.in_(movable)).returning(
+                *[tasks.c[name] for name in columns]
+            ).cte("moved")
+            result = session.execute(
+                insert(TaskArchiveEntity.__table__).from_select(columns, select(*[moved.c[name] for name in columns]))
+            )
+            session.commit()
+            return result.rowcount
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to archive tasks: {str(e)}")
+            raise
+
+    def get_partitions_before(self, session: Session, before: datetime) -> List[str]:
+        """Names of archive partitions holding only tasks created before given time, oldest first"""
+        rows = session.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+        """), {"parent": TaskArchiveEntity.__tablename__}).scalars().all()
+        partitions = []
+        for name in sorted(rows):
+            match = PARTITION_NAME_PATTERN.match(name)
+            if match is None:
+                continue
+            month = datetime(int(match.group(1)), int(match.group(2)), 1)
+            if _next_month(month) <= before.replace(tzinfo=None):
+                partitions.append(name)
+        return partitions
+
+    def export_and_drop_partition(self, name: str, directory: str) -> Optional[str]:
+        """
+        Write the partition to a gzip compressed CSV file in given directory and drop it, return the file path.
+        The file is complete before the partition is dropped, so an interrupted run only leaves work for the next one.
+        Returns None if another process is archiving the partition or already did. Existing files are never
+        overwritten, a month exported again, e.g. after a run interrupted before the drop or tasks archived late, is
+        written to the next free name tasks_archive_pYYYYMM.N.csv.gz.
+        """
+        if PARTITION_NAME_PATTERN.match(name) is None:
+            raise ValueError(f"{name} is not an archive partition")
+        os.makedirs(directory, exist_ok=True)
+        partial_path = os.path.join(directory, f"{name}.csv.gz.partial")
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AND to_regclass(%s) IS NOT NULL",
+                               (name, name))
+                if not cursor.fetchone()[0]:
+                    connection.rollback()
+                    return None
+                with gzip.open(partial_path, "wb") as file:
+                    cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", file)
+                path = self._publish_file(partial_path, directory, name)
+                cursor.execute(f"DROP TABLE {name}")
+            connection.commit()
+            logger.info(f"Archived partition {name} to {path}")
+            return path
+        except Exception as e:
+            connection.rollback()
+            logger.error(f"Failed to archive partition {name}: {str(e)}")
+            raise
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _publish_file(partial_path: str, directory: str, name: str) -> str:
+        """Give the written file the first free name, a hard link fails instead of replacing an existing file"""
+        suffix = 0
+        while True:
+            path = os.path.join(directory, f"{name}.csv.gz" if suffix == 0 else f"{name}.{suffix}.csv.gz")
+            try:
+                os.link(partial_path, path)
+            except FileExistsError:
+                suffix += 1
+                continue
+            os.remove(partial_path)
+            return path
+
+    @staticmethod
+    def _create_partitions(session: Session, start: datetime, end: datetime) -> None:
+        """Create monthly partitions covering [start, end)"""
+        month = _month_start(start)
+        while month < end.replace(tzinfo=None):
+            following = _next_month(month)
+            session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF tasks_archive "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            ))
+            month = following
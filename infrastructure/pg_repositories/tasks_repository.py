@@ -1,15 +1,27 @@
-from typing import Optional, List
+from dataclasses import fields
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple, Iterable, Dict
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, BigInteger
+from sqlalchemy import Column, Integer, String, Enum as SQLEnum, BigInteger, insert, update, Index, select, \
+    bindparam, func, tuple_, Select, Row, Insert, or_, and_, literal, Interval, ColumnElement, case, cast, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from domain.models import TaskStatus, TaskType, Task as TaskModel
-from infrastructure.pg_repositories.engine import Base, engine
+from config import settings
+from domain.models import TaskStatus, TaskType, Task as TaskModel, TaskFilter
+from domain.rows import TaskRow
+from infrastructure.pg_repositories.engine import Base, UtcDateTime
+from infrastructure.pg_repositories.task_outbox_repository import TaskOutboxEntity
 from utils.logger import AppLogger
 from utils.time_utils import TimeUtils
 
 logger = AppLogger.get_logger(__name__)
 
+# A channel has at most one task of each type in these statuses. Status updates only apply to tasks in them,
+# so finished or cancelled tasks stay that way when their message is delivered again.
+ACTIVE_STATUSES = [TaskStatus.PENDING, TaskStatus.RUNNING]
+
 
 class TaskEntity(Base):
     __tablename__ = 'tasks'
@@ -19,109 +31,444 @@ class TaskEntity(Base):
     task_type = Column(SQLEnum(TaskType), nullable=False)
     channel_id = Column(BigInteger, nullable=False)
     status = Column(SQLEnum(TaskStatus), nullable=False, default=TaskStatus.PENDING)
-    created_at = Column(DateTime, nullable=False, default=TimeUtils.current_datetime())
-    started_at = Column(DateTime, nullable=True)
-    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(UtcDateTime, nullable=False, default=TimeUtils.current_datetime)
+    started_at = Column(UtcDateTime, nullable=True)
+    completed_at = Column(UtcDateTime, nullable=True)
     error_message = Column(String, nullable=True)
     user_id_to_notify = Column(BigInteger, nullable=True)
+    idempotency_key = Column(String, nullable=True)  # Client supplied, repeated requests get the same task
+    # Running task is considered abandoned once this passes, the worker heartbeat keeps moving it forward
+    lease_expires_at = Column(UtcDateTime, nullable=True)
+    # Runs that failed or were abandoned, the task is dead-lettered once it reaches the maximum
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    __table_args__ = (
+        # Task lookups by channel, e.g. get_task_by_status and revisit planning
+        Index('ix_tasks_channel_id_task_type_status', 'channel_id', 'task_type', 'status'),
+        # Duplicate tasks are not inserted, see create_task. Active tasks are a small fraction of the table, so
+        # lookups of active tasks use it as well
+        Index(
+            'ux_tasks_active_channel_id_task_type',
+            'channel_id', 'task_type',
+            unique=True,
+            postgresql_where=status.in_(ACTIVE_STATUSES)
+        ),
+        Index('ux_tasks_idempotency_key', 'idempotency_key', unique=True),
+        # Keyset pagination of task listings
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        # Expired leases lookup of the task reaper
+        Index(
+            'ix_tasks_running_lease_expires_at',
+            'lease_expires_at',
+            postgresql_where=status == TaskStatus.RUNNING
+        ),
+    )
+
+
+# Columns in TaskRow field order, selected by Core statements that build rows without ORM entities
+TASK_ROW_COLUMNS = tuple(TaskEntity.__table__.c[field.name] for field in fields(TaskRow))
+
+
+def _task_rows(result: Iterable[Row]) -> List[TaskRow]:
+    return [TaskRow(*row) for row in result]
+
+
+def _new_task_rows(tasks: List[dict]) -> List[dict]:
+    created_at = TimeUtils.current_datetime()
+    return [
+        {
+            "message_id": task["message_id"],
+            "task_type": task["task_type"],
+            "channel_id": task["channel_id"],
+            "status": TaskStatus.PENDING,
+            "created_at": created_at,
+            "user_id_to_notify": task.get("user_id_to_notify"),
+            "idempotency_key": task.get("idempotency_key"),
+        }
+        for task in tasks
+    ]
+
+
+def _insert_new_tasks() -> Insert:
+    """Insert that skips tasks duplicating an active task of the channel or an idempotency key"""
+    return pg_insert(TaskEntity.__table__).on_conflict_do_nothing().returning(*TASK_ROW_COLUMNS)
+
+
+def _outbox_rows(tasks: List[dict], created: List[TaskRow]) -> List[dict]:
+    """Outbox rows of created tasks that carry a broker message"""
+    created_message_ids = {task.message_id for task in created}
+    now = TimeUtils.current_datetime()
+    return [
+        {
+            "message_id": task["message_id"],
+            "message": task["message"],
+            "available_at": task.get("available_at") or now,
+            "created_at": now,
+        }
+        for task in tasks
+        if task.get("message") is not None and task["message_id"] in created_message_ids
+    ]
+
+
+def lease_expiry(now: datetime) -> datetime:
+    """Lease end of a task started or heartbeated at given time"""
+    return now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+
+
+def _lease_expired(now: datetime) -> ColumnElement[bool]:
+    """Running tasks whose lease has passed. Tasks started before leases were tracked count from started_at."""
+    return and_(
+        TaskEntity.status == TaskStatus.RUNNING,
+        func.coalesce(
+            TaskEntity.lease_expires_at,
+            TaskEntity.started_at + literal(timedelta(seconds=settings.TASK_LEASE_SECONDS), Interval)
+        ) < now
+    )
+
+
+def _failed_attempt_values(max_attempts: int, error_message: Optional[str] = None) -> dict:
+    """
+    Values counting one more failed run of a task. Tasks with attempts left go back to PENDING to be enqueued again,
+    the others become DEAD_LETTERED.
+    """
+    status_type = TaskEntity.__table__.c.status.type
+    exhausted = TaskEntity.attempts + 1 >= max_attempts
+    values = {
+        "attempts": TaskEntity.attempts + 1,
+        "status": case(
+            (exhausted, cast(literal(TaskStatus.DEAD_LETTERED, status_type), status_type)),
+            else_=cast(literal(TaskStatus.PENDING, status_type), status_type)
+        ),
+        "started_at": None,
+        "lease_expires_at": None,
+        "completed_at": case((exhausted, literal(TimeUtils.current_datetime(), UtcDateTime)), else_=None),
+    }
+    if error_message:
+        values["error_message"] = error_message
+    return values
+
+
+def _status_values(status: TaskStatus, error_message: Optional[str]) -> dict:
+    values = {"status": status}
+    if status == TaskStatus.RUNNING:
+        values["started_at"] = TimeUtils.current_datetime()
+        values["lease_expires_at"] = lease_expiry(values["started_at"])
+    elif status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+        values["completed_at"] = TimeUtils.current_datetime()
+    if error_message:
+        values["error_message"] = error_message
+    return values
+
+
+def _filtered_tasks_query(task_filter: TaskFilter, after: Optional[Tuple[datetime, int]]) -> Select:
+    """Tasks matching the filter in (created_at, id) order, continuing after given key"""
+    stmt = select(TaskEntity)
+    if task_filter.statuses:
+        stmt = stmt.where(TaskEntity.status.in_(task_filter.statuses))
+    if task_filter.task_types:
+        stmt = stmt.where(TaskEntity.task_type.in_(task_filter.task_types))
+    if task_filter.channel_id is not None:
+        stmt = stmt.where(TaskEntity.channel_id == task_filter.channel_id)
+    if task_filter.created_after is not None:
+        stmt = stmt.where(TaskEntity.created_at >= task_filter.created_after)
+    if task_filter.created_before is not None:
+        stmt = stmt.where(TaskEntity.created_at < task_filter.created_before)
+    if after is not None:
+        stmt = stmt.where(tuple_(TaskEntity.created_at, TaskEntity.id) > tuple_(*after))
+    return stmt.order_by(TaskEntity.created_at, TaskEntity.id)
+
+
+def _latest_channel_tasks_query(channel_id: int, limit: int) -> Select:
+    """Up to limit tasks of the channel, newest first, a long revisit history is never loaded whole"""
+    return select(TaskEntity).where(TaskEntity.channel_id == channel_id).order_by(TaskEntity.id.desc()).limit(limit)
 
 
 class TasksRepository:
-    def __init__(self):
-        Base.metadata.create_all(engine)
+    """
+    Task operations for the worker and other internal callers.
+    Rows are read with Core statements into TaskRow, skipping ORM entities and pydantic validation.
+    """
 
     def create_task(self, session: Session, message_id: str, task_type: TaskType, channel_id: int,
-                    user_id_to_notify: Optional[int] = None) -> TaskModel:
-        """Create a new task record"""
+                    user_id_to_notify: Optional[int] = None, idempotency_key: Optional[str] = None,
+                    message: Optional[bytes] = None) -> Optional[TaskRow]:
+        """
+        Create a new task record, with its encoded broker message in the outbox if given.
+        Returns None if the channel already has an active task of the type or the idempotency key is taken.
+        """
         try:
-            task_entity = TaskEntity(
-                message_id=message_id,
-                task_type=task_type,
-                channel_id=channel_id,
-                status=TaskStatus.PENDING,
-                user_id_to_notify=user_id_to_notify
-            )
-            session.add(task_entity)
-            session.commit()
-            session.refresh(task_entity)
-            return TaskModel.model_validate(task_entity)
+            return next(iter(self.create_tasks_bulk(session, [{
+                "message_id": message_id,
+                "task_type": task_type,
+                "channel_id": channel_id,
+                "user_id_to_notify": user_id_to_notify,
+                "idempotency_key": idempotency_key,
+                "message": message,
+            }])), None)
         except Exception as e:
             session.rollback()
             logger.error(f"Failed to create task: {str(e)}")
             raise
 
+    def create_tasks_bulk(self, session: Session, tasks: List[dict]) -> List[TaskRow]:
+        """
+        Create task records with a single multi-row insert and return the created ones.
+        Each item holds message_id, task_type, channel_id and optionally user_id_to_notify, idempotency_key,
+        message and available_at. Encoded broker messages of created tasks go to the outbox in the same
+        transaction, to be published once available_at has passed.
+        Tasks duplicating an active task of the channel or an idempotency key are skipped.
+        """
+        try:
+            created = _task_rows(session.execute(_insert_new_tasks(), _new_task_rows(tasks)))
+            outbox_rows = _outbox_rows(tasks, created)
+            if outbox_rows:
+                session.execute(insert(TaskOutboxEntity.__table__), outbox_rows)
+            session.commit()
+            return created
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to create tasks: {str(e)}")
+            raise
+
     def update_task_status(
             self,
             session: Session,
             message_id: str,
             status: TaskStatus,
             error_message: Optional[str] = None
-    ) -> Optional[TaskModel]:
-        """Update task status and related fields"""
+    ) -> Optional[TaskRow]:
+        """
+        Update status and related fields of an active task, None if there is no such task.
+        A task only becomes RUNNING from PENDING or once the lease of its previous run expired, so a redelivered
+        message does not run next to a live worker.
+        """
         try:
-            task_entity = session.query(TaskEntity).filter_by(message_id=message_id).first()
-            if task_entity:
-                task_entity.status = status
-                if status == TaskStatus.RUNNING:
-                    task_entity.started_at = TimeUtils.current_datetime()
-                elif status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-                    task_entity.completed_at = TimeUtils.current_datetime()
-                if error_message:
-                    task_entity.error_message = error_message
-                session.commit()
-                session.refresh(task_entity)
-                return TaskModel.model_validate(task_entity)
-            return None
+            values = _status_values(status, error_message)
+            startable = or_(TaskEntity.status == TaskStatus.PENDING, _lease_expired(values["started_at"])) \
+                if status == TaskStatus.RUNNING else TaskEntity.status.in_(ACTIVE_STATUSES)
+            stmt = update(TaskEntity.__table__).where(
+                TaskEntity.message_id == message_id,
+                startable
+            ).values(**values).returning(*TASK_ROW_COLUMNS)
+            row = session.execute(stmt).one_or_none()
+            session.commit()
+            return TaskRow(*row) if row else None
         except Exception as e:
             session.rollback()
             logger.error(f"Failed to update task status: {str(e)}")
             raise
 
-    def get_task_by_message_id(self, session: Session, message_id: str) -> Optional[TaskModel]:
-        """Get task by Dramatiq message ID"""
-        task_entity = session.query(TaskEntity).filter_by(message_id=message_id).first()
-        return TaskModel.model_validate(task_entity) if task_entity else None
+    def apply_status_updates(self, session: Session, updates: List[dict]) -> None:
+        """
+        Apply buffered status transitions with one batched UPDATE.
+        Each item holds message_id, status, started_at, completed_at, error_message and lease_expires_at,
+        None values keep the current column value.
+        Tasks that are no longer active are left as they are.
+        """
+        if not updates:
+            return
+        try:
+            table = TaskEntity.__table__
+            stmt = update(table).where(
+                table.c.message_id == bindparam("b_message_id"),
+                # Expanding IN parameters cannot be used with executemany
+                or_(*(table.c.status == status for status in ACTIVE_STATUSES))
+            ).values(
+                status=bindparam("b_status"),
+                started_at=func.coalesce(bindparam("b_started_at", type_=UtcDateTime), table.c.started_at),
+                completed_at=func.coalesce(bindparam("b_completed_at", type_=UtcDateTime), table.c.completed_at),
+                error_message=func.coalesce(bindparam("b_error_message", type_=String), table.c.error_message),
+                lease_expires_at=func.coalesce(
+                    bindparam("b_lease_expires_at", type_=UtcDateTime), table.c.lease_expires_at
+                )
+            )
+            session.execute(stmt, [{f"b_{key}": value for key, value in item.items()} for item in updates])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to apply status updates: {str(e)}")
+            raise
 
-    def get_tasks_by_status(self, session: Session, status: TaskStatus) -> List[TaskModel]:
-        """Get all tasks with specified status"""
-        task_entities = session.query(TaskEntity).filter_by(status=status).all()
-        return [TaskModel.model_validate(entity) for entity in task_entities]
+    def extend_leases(self, session: Session, message_ids: List[str], lease_expires_at: datetime) -> int:
+        """Move lease end of running tasks forward with a single statement, return how many were extended"""
+        if not message_ids:
+            return 0
+        try:
+            result = session.execute(update(TaskEntity.__table__).where(
+                TaskEntity.message_id.in_(message_ids),
+                TaskEntity.status == TaskStatus.RUNNING
+            ).values(lease_expires_at=lease_expires_at))
+            session.commit()
+            return result.rowcount
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to extend task leases: {str(e)}")
+            raise
 
-    def get_task_by_status(self, channel_id: int, session: Session, task_type: TaskType, status: TaskStatus) -> \
-    Optional[TaskModel]:
-        """Get all tasks with specified status"""
-        entity = (session.query(TaskEntity)
-                  .filter_by(channel_id=channel_id)
-                  .filter_by(task_type=task_type)
-                  .filter_by(status=status).first())
-        return TaskModel.model_validate(entity) if entity else None
+    def requeue_expired_tasks(self, session: Session, now: datetime, limit: int,
+                              max_attempts: int) -> List[TaskRow]:
+        """
+        Count an abandoned run of up to limit running tasks with an expired lease with one UPDATE and return them.
+        Tasks with attempts left are back to PENDING, the others are DEAD_LETTERED. Rows locked by another reaper
+        are skipped. Nothing is committed, so the caller can enqueue the tasks again in the same transaction.
+        """
+        expired = select(TaskEntity.id).where(_lease_expired(now)).limit(limit).with_for_update(skip_locked=True)
+        stmt = update(TaskEntity.__table__).where(
+            TaskEntity.id.in_(expired.scalar_subquery())
+        ).values(**_failed_attempt_values(max_attempts)).returning(*TASK_ROW_COLUMNS)
+        return _task_rows(session.execute(stmt))
 
-    def get_all_tasks(self, session: Session) -> List[TaskModel]:
-        """Get all tasks"""
-        task_entities = session.query(TaskEntity).all()
-        return [TaskModel.model_validate(entity) for entity in task_entities]
+    def record_failed_attempt(self, session: Session, message_id: str, error_message: Optional[str],
+                              max_attempts: int) -> Optional[TaskRow]:
+        """
+        Count a failed run of an active task and return it, None if there is no such task.
+        The task is back to PENDING if it has attempts left, DEAD_LETTERED otherwise. Nothing is committed, so the
+        caller can enqueue the retry in the same transaction.
+        """
+        stmt = update(TaskEntity.__table__).where(
+            TaskEntity.message_id == message_id,
+            TaskEntity.status.in_(ACTIVE_STATUSES)
+        ).values(**_failed_attempt_values(max_attempts, error_message)).returning(*TASK_ROW_COLUMNS)
+        row = session.execute(stmt).one_or_none()
+        return TaskRow(*row) if row else None
+
+    def defer_task(self, session: Session, message_id: str, reason: str) -> Optional[TaskRow]:
+        """
+        Put an active task back to PENDING without counting an attempt and return it, None if there is no such task.
+        Nothing is committed, so the caller can enqueue the task again in the same transaction.
+        """
+        stmt = update(TaskEntity.__table__).where(
+            TaskEntity.message_id == message_id,
+            TaskEntity.status.in_(ACTIVE_STATUSES)
+        ).values(
+            status=TaskStatus.PENDING, started_at=None, lease_expires_at=None, error_message=reason
+        ).returning(*TASK_ROW_COLUMNS)
+        row = session.execute(stmt).one_or_none()
+        return TaskRow(*row) if row else None
+
+    def get_task_by_message_id(self, session: Session, message_id: str) -> Optional[TaskRow]:
+        """Get task by Dramatiq message ID"""
+        row = session.execute(select(*TASK_ROW_COLUMNS).where(TaskEntity.message_id == message_id)).first()
+        return TaskRow(*row) if row else None
+
+    def get_task_by_status(self, channel_id: int, session: Session, task_type: TaskType,
+                           status: TaskStatus) -> Optional[TaskRow]:
+        """Get task of the channel with specified type and status"""
+        stmt = select(*TASK_ROW_COLUMNS).where(
+            TaskEntity.channel_id == channel_id,
+            TaskEntity.task_type == task_type,
+            TaskEntity.status == status
+        ).limit(1)
+        row = session.execute(stmt).first()
+        return TaskRow(*row) if row else None
 
-    def get_task_by_id(self, session: Session, task_id: int) -> Optional[TaskModel]:
+    def get_tasks_page(self, session: Session, task_filter: TaskFilter, limit: int,
+                       after: Optional[Tuple[datetime, int]] = None) -> List[TaskRow]:
+        """Get up to limit tasks matching the filter that follow given (created_at, id) key"""
+        stmt = _filtered_tasks_query(task_filter, after).with_only_columns(*TASK_ROW_COLUMNS).limit(limit)
+        return _task_rows(session.execute(stmt))
+
+    def get_task_by_id(self, session: Session, task_id: int) -> Optional[TaskRow]:
         """Get task by ID"""
-        task_entity = session.query(TaskEntity).filter_by(id=task_id).first()
-        return TaskModel.model_validate(task_entity) if task_entity else None
+        row = session.execute(select(*TASK_ROW_COLUMNS).where(TaskEntity.id == task_id)).first()
+        return TaskRow(*row) if row else None
+
+    def get_tasks_by_channel(self, session: Session, channel_id: int, limit: int) -> List[TaskRow]:
+        """Get up to limit latest tasks of a channel in ID order"""
+        stmt = _latest_channel_tasks_query(channel_id, limit).with_only_columns(*TASK_ROW_COLUMNS)
+        return _task_rows(session.execute(stmt))[::-1]
+
+
+class AsyncTasksRepository:
+    """Same task operations as TasksRepository for code running on the event loop"""
 
-    def update_task_message_id(self, session: Session, task_id: int, message_id: str) -> TaskModel:
-        """Update task's message ID"""
+    async def create_task(self, session: AsyncSession, message_id: str, task_type: TaskType, channel_id: int,
+                          user_id_to_notify: Optional[int] = None, idempotency_key: Optional[str] = None,
+                          message: Optional[bytes] = None) -> Optional[TaskModel]:
+        """
+        Create a new task record, with its encoded broker message in the outbox if given.
+        Returns None if the channel already has an active task of the type or the idempotency key is taken.
+        """
+        created = await self.create_tasks_bulk(session, [{
+            "message_id": message_id,
+            "task_type": task_type,
+            "channel_id": channel_id,
+            "user_id_to_notify": user_id_to_notify,
+            "idempotency_key": idempotency_key,
+            "message": message,
+        }])
+        return TaskModel.model_validate(created[0]) if created else None
+
+    async def create_tasks_bulk(self, session: AsyncSession, tasks: List[dict]) -> List[TaskRow]:
+        """
+        Create task records with a single multi-row insert and return the created ones.
+        Each item holds message_id, task_type, channel_id and optionally user_id_to_notify, idempotency_key,
+        message and available_at. Encoded broker messages of created tasks go to the outbox in the same
+        transaction, to be published once available_at has passed.
+        Tasks duplicating an active task of the channel or an idempotency key are skipped.
+        Returns rows, not models, as the revisit scheduler creates tasks in batches of thousands.
+        """
         try:
-            task_entity = session.query(TaskEntity).filter_by(id=task_id).first()
-            if task_entity:
-                task_entity.message_id = message_id
-                session.commit()
-                session.refresh(task_entity)
-                return TaskModel.model_validate(task_entity)
-            raise ValueError(f"Task with ID {task_id} not found")
+            created = _task_rows(await session.execute(_insert_new_tasks(), _new_task_rows(tasks)))
+            outbox_rows = _outbox_rows(tasks, created)
+            if outbox_rows:
+                await session.execute(insert(TaskOutboxEntity.__table__), outbox_rows)
+            await session.commit()
+            return created
         except Exception as e:
-            session.rollback()
-            logger.error(f"Failed to update task message ID: {str(e)}")
+            await session.rollback()
+            logger.error(f"Failed to create tasks: {str(e)}")
             raise
 
-    def get_tasks_by_channel(self, session: Session, channel_id: int) -> List[TaskModel]:
-        """Get all tasks for a specific channel"""
-        task_entities = session.query(TaskEntity).filter_by(channel_id=channel_id).all()
+    async def get_active_task(self, session: AsyncSession, channel_id: int,
+                              task_type: TaskType) -> Optional[TaskModel]:
+        """Get pending or running task of the channel with specified type"""
+        stmt = select(TaskEntity).where(
+            TaskEntity.channel_id == channel_id,
+            TaskEntity.task_type == task_type,
+            TaskEntity.status.in_(ACTIVE_STATUSES)
+        )
+        entity = (await session.scalars(stmt)).first()
+        return TaskModel.model_validate(entity) if entity else None
+
+    async def get_active_tasks(self, session: AsyncSession, keys: List[Tuple[int, TaskType]]) -> List[TaskRow]:
+        """Get pending or running tasks for given (channel_id, task_type) pairs"""
+        if not keys:
+            return []
+        stmt = select(*TASK_ROW_COLUMNS).where(
+            tuple_(TaskEntity.channel_id, TaskEntity.task_type).in_(keys),
+            TaskEntity.status.in_(ACTIVE_STATUSES)
+        )
+        return _task_rows(await session.execute(stmt))
+
+    async def get_tasks_by_idempotency_keys(self, session: AsyncSession,
+                                            idempotency_keys: List[str]) -> Dict[str, TaskRow]:
+        """Get tasks created with given idempotency keys, by key"""
+        if not idempotency_keys:
+            return {}
+        stmt = select(TaskEntity.idempotency_key, *TASK_ROW_COLUMNS).where(
+            TaskEntity.idempotency_key.in_(idempotency_keys)
+        )
+        return {row[0]: TaskRow(*row[1:]) for row in await session.execute(stmt)}
+
+    async def get_task_by_idempotency_key(self, session: AsyncSession, idempotency_key: str) -> Optional[TaskModel]:
+        """Get task created with given idempotency key"""
+        stmt = select(TaskEntity).where(TaskEntity.idempotency_key == idempotency_key)
+        entity = (await session.scalars(stmt)).first()
+        return TaskModel.model_validate(entity) if entity else None
+
+    async def get_task_by_id(self, session: AsyncSession, task_id: int) -> Optional[TaskModel]:
+        """Get task by ID"""
+        task_entity = await session.get(TaskEntity, task_id)
+        return TaskModel.model_validate(task_entity) if task_entity else None
+
+    async def get_tasks_by_channel(self, session: AsyncSession, channel_id: int, limit: int) -> List[TaskModel]:
+        """Get up to limit latest tasks of a channel in ID order"""
+        task_entities = (await session.scalars(_latest_channel_tasks_query(channel_id, limit))).all()
+        return [TaskModel.model_validate(entity) for entity in reversed(task_entities)]
+
+    async def get_tasks_page(self, session: AsyncSession, task_filter: TaskFilter, limit: int,
+                             after: Optional[Tuple[datetime, int]] = None) -> List[TaskModel]:
+        """Get up to limit tasks matching the filter that follow given (created_at, id) key"""
+        task_entities = (await session.scalars(_filtered_tasks_query(task_filter, after).limit(limit))).all()
         return [TaskModel.model_validate(entity) for entity in task_entities]
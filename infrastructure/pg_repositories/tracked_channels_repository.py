@@ -1,11 +1,16 @@
-from datetime import datetime
-from typing import List, Optional
+from dataclasses import fields
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict
 
-from sqlalchemy import Column, Integer, Boolean, DateTime, BigInteger, select, update
+from sqlalchemy import Column, Integer, Boolean, BigInteger, select, update, exists, Index, \
+    Select, Update, bindparam, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from domain.models import TrackedChannel
-from infrastructure.pg_repositories.engine import Base, engine
+from domain.models import TaskType, TaskStatus
+from domain.rows import TrackedChannelRow
+from infrastructure.pg_repositories.engine import Base, UtcDateTime
+from infrastructure.pg_repositories.tasks_repository import TaskEntity
 from utils.logger import AppLogger
 from utils.time_utils import TimeUtils
 
@@ -18,85 +23,176 @@ class TrackedChannelEntity(Base):
     id = Column(Integer, primary_key=True)
     channel_id = Column(BigInteger, nullable=False, unique=True)
     revisiting = Column(Boolean, nullable=False, default=True)
-    last_revisited = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, nullable=False, default=TimeUtils.current_datetime())
+    last_revisited = Column(UtcDateTime, nullable=True)
+    created_at = Column(UtcDateTime, nullable=False, default=TimeUtils.current_datetime)
+    next_revisit_at = Column(UtcDateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset scan of the revisit schedule
+        Index('ix_tracked_channels_next_revisit_at', 'next_revisit_at', 'id', postgresql_where=revisiting == True),
+    )
+
+
+# Columns in TrackedChannelRow field order, selected by Core statements that build rows without ORM entities
+TRACKED_CHANNEL_ROW_COLUMNS = tuple(TrackedChannelEntity.__table__.c[field.name] for field in fields(TrackedChannelRow))
 
 
 class TrackedChannelsRepository:
-    def __init__(self):
-        Base.metadata.create_all(engine)
+    """Tracked channels operations for the worker and other internal callers, reads build TrackedChannelRow"""
 
-    def add_channel(self, session: Session, channel_id: int) -> TrackedChannel:
+    def add_channel(self, session: Session, channel_id: int, interval_minutes: int) -> TrackedChannelRow:
         """Add a new channel to tracking"""
         try:
-            channel_entity = TrackedChannelEntity(
+            now = TimeUtils.current_datetime()
+            stmt = insert(TrackedChannelEntity.__table__).values(
                 channel_id=channel_id,
                 revisiting=True,
-                last_revisited=TimeUtils.current_datetime(),
-                created_at=TimeUtils.current_datetime()
-            )
-            session.add(channel_entity)
+                last_revisited=now,
+                created_at=now,
+                next_revisit_at=now + timedelta(minutes=interval_minutes)
+            ).returning(*TRACKED_CHANNEL_ROW_COLUMNS)
+            channel = TrackedChannelRow(*session.execute(stmt).one())
             session.commit()
-            session.refresh(channel_entity)
-            return TrackedChannel.model_validate(channel_entity)
+            return channel
         except Exception as e:
             session.rollback()
             logger.error(f"Failed to add channel: {str(e)}")
             raise
 
-    def update_last_revisited(self, session: Session, channel_id: int) -> Optional[TrackedChannel]:
-        """Update last_revisited timestamp for a channel"""
+    def update_last_revisited(self, session: Session, channel_id: int,
+                              interval_minutes: int) -> Optional[TrackedChannelRow]:
+        """Update last_revisited timestamp for a channel and schedule its next revisit"""
         try:
-            stmt = update(TrackedChannelEntity).where(
+            now = TimeUtils.current_datetime()
+            stmt = update(TrackedChannelEntity.__table__).where(
                 TrackedChannelEntity.channel_id == channel_id
             ).values(
-                last_revisited=TimeUtils.current_datetime()
-            ).returning(TrackedChannelEntity)
+                last_revisited=now,
+                next_revisit_at=now + timedelta(minutes=interval_minutes)
+            ).returning(*TRACKED_CHANNEL_ROW_COLUMNS)
 
-            result = session.execute(stmt)
+            updated = session.execute(stmt).one_or_none()
             session.commit()
-            updated = result.scalar_one_or_none()
-            return TrackedChannel.model_validate(updated) if updated else None
+            return TrackedChannelRow(*updated) if updated else None
         except Exception as e:
             session.rollback()
             logger.error(f"Failed to update last_revisited: {str(e)}")
             raise
 
-    def get_channels_due_revisit(self, session: Session, interval_minutes: int) -> List[TrackedChannel]:
-        """Get all channels that haven't been revisited in the specified interval"""
+    def update_last_revisited_many(self, session: Session, revisited: Dict[int, datetime],
+                                   interval_minutes: int) -> None:
+        """Set last_revisited of several channels with one batched UPDATE and schedule their next revisits"""
+        if not revisited:
+            return
+        try:
+            table = TrackedChannelEntity.__table__
+            stmt = update(table).where(
+                table.c.channel_id == bindparam("b_channel_id")
+            ).values(
+                last_revisited=bindparam("b_last_revisited"),
+                next_revisit_at=bindparam("b_next_revisit_at")
+            )
+            session.execute(stmt, [
+                {
+                    "b_channel_id": channel_id,
+                    "b_last_revisited": revisited_at,
+                    "b_next_revisit_at": revisited_at + timedelta(minutes=interval_minutes)
+                }
+                for channel_id, revisited_at in revisited.items()
+            ])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to update last_revisited: {str(e)}")
+            raise
 
-        # All channels that were last time revisited BEFORE the cutoff time will be fetched
-        cutoff_time = TimeUtils.current_datetime().timestamp() - (interval_minutes * 60)
-        stmt = select(TrackedChannelEntity).where(
+    @staticmethod
+    def _claim_due_channels_statement(due_before: datetime, task_type: TaskType, blocking_statuses: List[TaskStatus],
+                                      limit: int, lease_minutes: int) -> Update:
+        claimable = TrackedChannelsRepository._due_channels_query(
+            TrackedChannelEntity.id,
+            due_before=due_before,
+            task_type=task_type,
+            blocking_statuses=blocking_statuses
+        ).order_by(
+            TrackedChannelEntity.next_revisit_at, TrackedChannelEntity.id
+        ).limit(limit).with_for_update(skip_locked=True)
+        return update(TrackedChannelEntity).where(
+            TrackedChannelEntity.id.in_(claimable)
+        ).values(
+            next_revisit_at=TimeUtils.current_datetime() + timedelta(minutes=lease_minutes)
+        ).returning(TrackedChannelEntity.channel_id)
+
+    @staticmethod
+    def _due_channels_query(*columns, due_before: datetime, task_type: TaskType,
+                            blocking_statuses: List[TaskStatus]) -> Select:
+        blocking_task = exists().where(
+            TaskEntity.channel_id == TrackedChannelEntity.channel_id,
+            TaskEntity.task_type == task_type,
+            TaskEntity.status.in_(blocking_statuses)
+        )
+        return select(*columns).where(
             TrackedChannelEntity.revisiting == True,
-            (
-                    TrackedChannelEntity.last_revisited.is_(None) |
-                    (TrackedChannelEntity.last_revisited <= datetime.fromtimestamp(cutoff_time))
-            )
+            TrackedChannelEntity.next_revisit_at <= due_before,
+            ~blocking_task
         )
-        result = session.execute(stmt)
-        channels = result.scalars().all()
-        return [TrackedChannel.model_validate(ch) for ch in channels]
 
-    def set_revisiting(self, session: Session, channel_id: int, revisiting: bool) -> Optional[TrackedChannel]:
+    def set_revisiting(self, session: Session, channel_id: int, revisiting: bool) -> Optional[TrackedChannelRow]:
         """Enable or disable revisiting for a channel"""
         try:
-            stmt = update(TrackedChannelEntity).where(
+            stmt = update(TrackedChannelEntity.__table__).where(
                 TrackedChannelEntity.channel_id == channel_id
             ).values(
                 revisiting=revisiting
-            ).returning(TrackedChannelEntity)
+            ).returning(*TRACKED_CHANNEL_ROW_COLUMNS)
 
-            result = session.execute(stmt)
+            updated = session.execute(stmt).one_or_none()
             session.commit()
-            updated = result.scalar_one_or_none()
-            return TrackedChannel.model_validate(updated) if updated else None
+            return TrackedChannelRow(*updated) if updated else None
         except Exception as e:
             session.rollback()
             logger.error(f"Failed to update revisiting status: {str(e)}")
             raise
 
-    def get_channel(self, session: Session, channel_id: int) -> Optional[TrackedChannel]:
+    def get_channel(self, session: Session, channel_id: int) -> Optional[TrackedChannelRow]:
         """Get channel by ID"""
-        channel = session.query(TrackedChannelEntity).filter_by(channel_id=channel_id).first()
-        return TrackedChannel.model_validate(channel) if channel else None
+        row = session.execute(
+            select(*TRACKED_CHANNEL_ROW_COLUMNS).where(TrackedChannelEntity.channel_id == channel_id)
+        ).first()
+        return TrackedChannelRow(*row) if row else None
+
+
+class AsyncTrackedChannelsRepository:
+    """Tracked channels operations for code running on the event loop"""
+
+    async def claim_due_channels(
+            self,
+            session: AsyncSession,
+            due_before: datetime,
+            task_type: TaskType,
+            blocking_statuses: List[TaskStatus],
+            limit: int,
+            lease_minutes: int
+    ) -> List[int]:
+        """
+        Claim up to limit due channels and return their ids.
+        Claimed channels get next_revisit_at moved forward by the lease, so they leave the due set as soon as
+        the claim commits. Rows being claimed by a concurrent scheduler are skipped instead of waited for,
+        so every scheduler instance gets a disjoint chunk. Nothing is committed, so the caller creates the revisit
+        tasks in the same transaction and a failure to create them leaves the channels due.
+        """
+        stmt = TrackedChannelsRepository._claim_due_channels_statement(
+            due_before, task_type, blocking_statuses, limit, lease_minutes
+        )
+        return list((await session.scalars(stmt)).all())
+
+    async def count_due_channels(self, session: AsyncSession, due_before: datetime) -> int:
+        """
+        Count revisiting channels due before given time, including ones held back by a pending or running revisit.
+        Counted over the partial next_revisit_at index, so the cost grows with the backlog, not the table.
+        """
+        stmt = select(func.count()).select_from(TrackedChannelEntity).where(
+            TrackedChannelEntity.revisiting == True,
+            TrackedChannelEntity.next_revisit_at <= due_before
+        )
+        return (await session.execute(stmt)).scalar_one()
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, BigInteger, Integer, Index, select, delete, insert, update, text, Row, func
+from sqlalchemy.orm import Session
+
+from infrastructure.pg_repositories.engine import Base, UtcDateTime
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+
+class UserNotificationEntity(Base):
+    """Notifications of channels ready for a user, queued by workers and sent in digests by the notification sender"""
+    __tablename__ = 'user_notifications'
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, nullable=False)  # Nity user to notify
+    channel_id = Column(BigInteger, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))  # Failed sends
+    available_at = Column(UtcDateTime, nullable=False)  # Not sent before, pushed forward while claimed
+    created_at = Column(UtcDateTime, nullable=False, default=TimeUtils.current_datetime)
+
+    __table_args__ = (
+        # Due notifications lookup in claim_due_notifications
+        Index('ix_user_notifications_available_at', 'available_at'),
+        # Pending notifications of a user joining the digest
+        Index('ix_user_notifications_user_id', 'user_id'),
+    )
+
+
+class UserNotificationsRepository:
+    def add_notification(self, session: Session, user_id: int, channel_id: int, available_at: datetime) -> None:
+        """Queue a notification and commit, together with whatever the caller changed in the session"""
+        try:
+            session.execute(insert(UserNotificationEntity.__table__).values(
+                user_id=user_id,
+                channel_id=channel_id,
+                attempts=0,
+                available_at=available_at,
+                created_at=TimeUtils.current_datetime()
+            ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to add user notification: {str(e)}")
+            raise
+
+    def claim_due_notifications(self, session: Session, now: datetime, limit: int,
+                                claimed_until: datetime) -> List[Row]:
+        """
+        Claim all pending notifications of up to limit users with a notification due, and return rows of
+        (id, user_id, channel_id, attempts). Claimed notifications become available again at claimed_until, unless
+        they are deleted or rescheduled before. Notifications locked by another sender are skipped.
+        """
+        try:
+            # Grouped before the limit, a user with many due notifications takes one of the limit slots
+            due_users = select(UserNotificationEntity.user_id).where(
+                UserNotificationEntity.available_at <= now
+            ).group_by(UserNotificationEntity.user_id).order_by(
+                func.min(UserNotificationEntity.available_at)
+            ).limit(limit)
+            stmt = select(
+                UserNotificationEntity.id, UserNotificationEntity.user_id, UserNotificationEntity.channel_id,
+                UserNotificationEntity.attempts
+            ).where(
+                UserNotificationEntity.user_id.in_(due_users)
+            ).order_by(UserNotificationEntity.id).with_for_update(skip_locked=True)
+            rows = list(session.execute(stmt).all())
+            if rows:
+                session.execute(update(UserNotificationEntity).where(
+                    UserNotificationEntity.id.in_([row.id for row in rows])
+                ).values(available_at=claimed_until))
+            session.commit()
+            return rows
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to claim user notifications: {str(e)}")
+            raise
+
+    def delete_notifications(self, session: Session, ids: List[int]) -> None:
+        """Delete sent or abandoned notifications"""
+        try:
+            if ids:
+                session.execute(delete(UserNotificationEntity).where(UserNotificationEntity.id.in_(ids)))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to delete user notifications: {str(e)}")
+            raise
+
+    def reschedule_notifications(self, session: Session, ids: List[int], available_at: datetime) -> None:
+        """Count a failed send of the notifications and make them available again at given time"""
+        try:
+            if ids:
+                session.execute(update(UserNotificationEntity).where(
+                    UserNotificationEntity.id.in_(ids)
+                ).values(
+                    attempts=UserNotificationEntity.attempts + 1,
+                    available_at=available_at
+                ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to reschedule user notifications: {str(e)}")
+            raise
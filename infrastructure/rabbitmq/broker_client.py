@@ -1,6 +1,7 @@
 import subprocess
 import dramatiq
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from dramatiq.brokers.stub import StubBroker
 from dramatiq.middleware import CurrentMessage
 import requests
 from requests.auth import HTTPBasicAuth
@@ -22,12 +23,15 @@ class BrokerClient:
 
     def __init__(self):
         if self._broker is None:
-            self._ensure_vhost_exists()
+            if settings.BROKER_BACKEND == "stub":
+                self._initialize_stub_broker()
+                return
+            # The broker connects on first use, the vhost is created by migrations
             self._initialize_broker()
             logger.info("RabbitMQ broker initialized successfully")
 
 
-    def _ensure_vhost_exists(self):
+    def ensure_vhost(self):
         """Ensure that the virtual host exists, create if it doesn't"""
         try:
             # First try HTTP API
@@ -107,7 +111,7 @@ class BrokerClient:
             url = f"amqp://{settings.RABBITMQ_USER}:{settings.RABBITMQ_PASSWORD}@" \
                   f"{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}/{settings.RABBITMQ_VHOST}"
 
-            self._broker = RabbitmqBroker(url=url)
+            self._broker = RabbitmqBroker(url=url, confirm_delivery=settings.RABBITMQ_CONFIRM_DELIVERY)
             dramatiq.set_broker(self._broker)
 
             # Add CurrentMessage middleware if not already present
@@ -119,8 +123,16 @@ class BrokerClient:
             logger.error(f"Failed to initialize RabbitMQ broker: {str(e)}")
             raise
 
+    def _initialize_stub_broker(self):
+        """Initialize in-memory dramatiq broker for local runs and benchmarks"""
+        self._broker = StubBroker()
+        dramatiq.set_broker(self._broker)
+        if not any(isinstance(m, CurrentMessage) for m in self._broker.middleware):
+            self._broker.add_middleware(CurrentMessage())
+        logger.warning("In-memory stub broker initialized, messages are not persisted")
+
     @property
-    def broker(self) -> RabbitmqBroker:
+    def broker(self) -> dramatiq.Broker:
         """Get the initialized broker instance"""
         return self._broker
 
@@ -1,23 +1,45 @@
-import logging
-import sys
+import os
+import shutil
 
-from dramatiq.cli import main as dramatiq_main
+from dramatiq.middleware.prometheus import DB_PATH as METRICS_DIR
 
-from config import settings
-from services import tasks_queue
-from services.tasks_health import SimpleHealthCheck
-from utils.logger import AppLogger
+# Worker processes share metrics through files in the directory of Dramatiq's Prometheus middleware.
+# prometheus_client picks its multiprocess mode on import, so it is set up before the application is imported.
+if __name__ == "__main__":
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_DIR
+
+import logging  # noqa: E402
+import signal  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+
+from dramatiq.cli import main as dramatiq_main  # noqa: E402
+
+from config import settings  # noqa: E402
+from infrastructure.migrations import migrate_on_startup  # noqa: E402
+from services import tasks_queue  # noqa: E402
+from services.async_worker import run_async_worker  # noqa: E402
+from services.tasks_health import SimpleHealthCheck  # noqa: E402
+from utils.logger import AppLogger  # noqa: E402
 
 # Configure logging
 AppLogger.setup(log_file='worker.log', level=logging.INFO)
 logger = AppLogger.get_logger(__name__)
 
 
+def prepare_worker():
+    """Startup shared by all worker processes, done once before they are forked"""
+    migrate_on_startup()
+    tasks_queue.setup_worker()
+
+
 def run_worker():
     """Run the dramatiq worker"""
     try:
         logger.info("Starting worker process")
-        tasks_queue.ping()
+        prepare_worker()
 
         sys.argv = [
             "dramatiq",
@@ -33,6 +55,32 @@ def run_worker():
         raise
 
 
+def run_async_worker_process():
+    """Run actors as coroutines on one event loop of this process"""
+    try:
+        logger.info("Starting async worker process")
+        prepare_worker()
+
+        stop_event = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+        run_async_worker(
+            broker=tasks_queue.broker_client.broker,
+            handlers=tasks_queue.ASYNC_ACTOR_HANDLERS,
+            concurrency=settings.WORKER_ASYNC_CONCURRENCY,
+            hook_threads=settings.WORKER_THREADS,
+            stop_event=stop_event,
+            reserved_slots=settings.WORKER_ASYNC_INTERACTIVE_SLOTS,
+            reserved_priority=settings.START_TRACKING_PRIORITY
+        )
+    except Exception as e:
+        logger.error(f"Worker error: {str(e)}")
+        raise
+
+
 if __name__ == "__main__":
     healthcheck = SimpleHealthCheck(80)
-    run_worker()
+    if settings.WORKER_MODE == "asyncio":
+        run_async_worker_process()
+    else:
+        run_worker()
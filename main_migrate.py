@@ -0,0 +1,14 @@
+import logging
+
+from infrastructure.migrations import migrate
+from utils.logger import AppLogger
+
+AppLogger.setup(log_file='migrate.log', level=logging.INFO)
+logger = AppLogger.get_logger(__name__)
+
+if __name__ == '__main__':
+    try:
+        migrate()
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
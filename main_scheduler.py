@@ -3,7 +3,13 @@ import logging
 
 from api.server import TasksGrpcServer
 from infrastructure.di.container import get_container
+from infrastructure.migrations import migrate_on_startup
+from services.notification_sender import NotificationSender
+from services.outbox_relay import OutboxRelay
 from services.revisit_scheduler import RevisitScheduler
+from services.task_reaper import TaskReaper
+from services.task_retention import TaskRetentionJob
+from services.tasks_service import TasksService
 from utils.healthcheck import run_health_server
 from utils.logger import AppLogger
 
@@ -13,11 +19,17 @@ logger = AppLogger.get_logger(__name__)
 
 async def start_services():
     """Initialize services on startup"""
+    await asyncio.to_thread(migrate_on_startup)
     container = get_container()
     logger.info("All services started successfully")
     server = container.get(TasksGrpcServer)
+    await container.get(TasksService).start()
+    container.get(OutboxRelay).start()
     revisit_scheduler = container.get(RevisitScheduler)
     asyncio.create_task(revisit_scheduler.start())
+    asyncio.create_task(container.get(TaskRetentionJob).start())
+    asyncio.create_task(container.get(TaskReaper).start())
+    asyncio.create_task(container.get(NotificationSender).start())
     await server.serve()
 
 async def main():
@@ -0,0 +1,243 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from queue import Empty
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import dramatiq
+from dramatiq import Worker
+from dramatiq.errors import Retry
+from dramatiq.middleware import SkipMessage, TimeLimit, TimeLimitExceeded, ShutdownNotifications
+
+from infrastructure.nity.base import run_in_thread_loop
+from utils.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+AsyncHandler = Callable[..., Awaitable]
+
+# These middleware interrupt the thread that runs the message, which would hit a random hook thread here.
+# Time limits are enforced on the event loop instead.
+THREAD_BOUND_MIDDLEWARE = (TimeLimit, ShutdownNotifications)
+DEFAULT_TIME_LIMIT_MS = 600_000
+# While only reserved slots are free the loop polls for interactive messages this often, so a slot freed by a
+# background message is noticed quickly
+RESERVED_POLL_SECONDS = 0.05
+
+
+class AsyncWorker(Worker):
+    """
+    Dramatiq worker that runs actors as coroutines on a single event loop.
+    Consumers, delayed messages and acks are handled by the regular Dramatiq consumer threads, only the
+    worker threads are replaced by one event loop running up to concurrency messages at a time.
+    Middleware hooks run on a small thread pool, so blocking hooks like TaskExecutionMiddleware keep working.
+    Messages are taken in actor priority order. reserved_slots of the concurrency are kept for messages with
+    priority up to reserved_priority, background messages never take the last free slots.
+    """
+
+    def __init__(self, broker: dramatiq.Broker, handlers: Dict[str, AsyncHandler], *, concurrency: int,
+                 hook_threads: int, reserved_slots: int = 0, reserved_priority: int = 0, queues=None,
+                 worker_timeout: int = 1000):
+        # Prefetch is derived from worker_threads, so it is sized by the number of in-flight messages
+        super().__init__(broker, queues=queues, worker_timeout=worker_timeout, worker_threads=concurrency)
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.hook_threads = hook_threads
+        self.reserved_slots = min(reserved_slots, concurrency - 1)
+        self.reserved_priority = reserved_priority
+
+    def _add_worker(self):
+        if self.workers:
+            return
+        worker = _EventLoopWorkerThread(
+            broker=self.broker,
+            consumers=self.consumers,
+            work_queue=self.work_queue,
+            worker_timeout=self.worker_timeout,
+            handlers=self.handlers,
+            concurrency=self.concurrency,
+            hook_threads=self.hook_threads,
+            reserved_slots=self.reserved_slots,
+            reserved_priority=self.reserved_priority
+        )
+        worker.start()
+        self.workers.append(worker)
+
+
+class _EventLoopWorkerThread(threading.Thread):
+    """Takes messages off the work queue and processes them concurrently on the event loop of this thread"""
+
+    def __init__(self, *, broker: dramatiq.Broker, consumers: dict, work_queue, worker_timeout: int,
+                 handlers: Dict[str, AsyncHandler], concurrency: int, hook_threads: int, reserved_slots: int,
+                 reserved_priority: int):
+        super().__init__(daemon=True)
+        self.broker = broker
+        self.consumers = consumers
+        self.work_queue = work_queue
+        self.timeout = worker_timeout / 1000
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.reserved_slots = reserved_slots
+        self.reserved_priority = reserved_priority
+        self.hooks_executor = ThreadPoolExecutor(max_workers=hook_threads, thread_name_prefix="worker-hooks")
+        self.middleware = [m for m in broker.middleware if not isinstance(m, THREAD_BOUND_MIDDLEWARE)]
+        time_limit = next((m for m in broker.middleware if isinstance(m, TimeLimit)), None)
+        self.default_time_limit = time_limit.time_limit if time_limit else DEFAULT_TIME_LIMIT_MS
+        self.running = False
+        self.paused = False
+        self.paused_event = threading.Event()
+
+    def run(self):
+        self.running = True
+        self.broker.emit_after("worker_thread_boot", self)
+        try:
+            run_in_thread_loop(self._run())
+        finally:
+            self.hooks_executor.shutdown(wait=True)
+            self.broker.emit_before("worker_thread_shutdown", self)
+            logger.info("Event loop worker stopped")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight: Set[asyncio.Task] = set()
+        background_limit = self.concurrency - self.reserved_slots
+        background_in_flight = 0
+
+        def background_done(_):
+            nonlocal background_in_flight
+            background_in_flight -= 1
+
+        while self.running:
+            if self.paused:
+                self.paused_event.set()
+                await asyncio.sleep(self.timeout)
+                continue
+
+            await slots.acquire()
+            # Once background messages hold all unreserved slots, only interactive ones are taken
+            max_priority = self.reserved_priority if background_in_flight >= background_limit else None
+            item = await loop.run_in_executor(None, self._next_message, max_priority)
+            if item is None:
+                slots.release()
+                continue
+
+            priority, message = item
+            task = loop.create_task(self._process_message(message))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            task.add_done_callback(lambda _: slots.release())
+            if priority > self.reserved_priority:
+                background_in_flight += 1
+                task.add_done_callback(background_done)
+
+        # Let messages in progress finish, the ones still in the work queue are requeued by Worker.stop
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    def _next_message(self, max_priority: Optional[int] = None) -> Optional[Tuple[int, dramatiq.MessageProxy]]:
+        """Take the next (priority, message), limited to priority up to max_priority when it is given"""
+        if max_priority is None:
+            try:
+                return self.work_queue.get(timeout=self.timeout)
+            except Empty:
+                return None
+
+        # Peek at the head of the priority queue under its lock, lower priority messages stay queued
+        work_queue = self.work_queue
+        with work_queue.not_empty:
+            if not self._has_message(max_priority):
+                work_queue.not_empty.wait(RESERVED_POLL_SECONDS)
+            if not self._has_message(max_priority):
+                return None
+            item = work_queue._get()
+            work_queue.not_full.notify()
+            return item
+
+    def _has_message(self, max_priority: int) -> bool:
+        return bool(self.work_queue.queue) and self.work_queue.queue[0][0] <= max_priority
+
+    async def _process_message(self, message: dramatiq.MessageProxy):
+        """Same flow as the Dramatiq worker thread, with the actor awaited instead of called"""
+        actor = None
+        try:
+            await self._emit("before", "process_message", message)
+
+            result = None
+            if not message.failed:
+                actor = self.broker.get_actor(message.actor_name)
+                handler = self.handlers[message.actor_name]
+                time_limit = message.options.get("time_limit") or actor.options.get("time_limit") \
+                    or self.default_time_limit
+                try:
+                    result = await asyncio.wait_for(handler(*message.args, **message.kwargs), time_limit / 1000)
+                except asyncio.TimeoutError:
+                    raise TimeLimitExceeded(f"Message {message.message_id} exceeded time limit of {time_limit}ms")
+
+            await self._emit("after", "process_message", message, result=result)
+
+        except SkipMessage as e:
+            if message.failed:
+                message.stuff_exception(e)
+            logger.warning(f"Message {message} was skipped")
+            await self._emit("after", "skip_message", message)
+
+        except (Exception, TimeLimitExceeded) as e:
+            message.stuff_exception(e)
+            throws = message.options.get("throws") or (actor and actor.options.get("throws"))
+            if not isinstance(e, Retry) and not (throws and isinstance(e, throws)):
+                logger.error(f"Failed to process message {message} with unhandled exception: {str(e)}")
+            await self._emit("after", "process_message", message, exception=e)
+
+        finally:
+            await asyncio.get_running_loop().run_in_executor(
+                self.hooks_executor, self.consumers[message.queue_name].post_process_message, message
+            )
+            self.work_queue.task_done()
+            message.clear_exception()
+
+    async def _emit(self, kind: str, signal: str, *args, **kwargs):
+        await asyncio.get_running_loop().run_in_executor(
+            self.hooks_executor, partial(self._emit_sync, kind, signal, *args, **kwargs)
+        )
+
+    def _emit_sync(self, kind: str, signal: str, *args, **kwargs):
+        """broker.emit_before/emit_after without the thread bound middleware"""
+        middleware = self.middleware if kind == "before" else reversed(self.middleware)
+        for m in middleware:
+            try:
+                getattr(m, f"{kind}_{signal}")(self.broker, *args, **kwargs)
+            except SkipMessage:
+                raise
+            except Exception as e:
+                logger.critical(f"Unexpected failure in {kind}_{signal} of {m!r}: {str(e)}")
+
+    def pause(self):
+        self.paused = True
+        self.paused_event.clear()
+
+    def resume(self):
+        self.paused = False
+        self.paused_event.clear()
+
+    def stop(self):
+        self.running = False
+
+
+def run_async_worker(broker: dramatiq.Broker, handlers: Dict[str, AsyncHandler], concurrency: int,
+                     hook_threads: int, stop_event: threading.Event, reserved_slots: int = 0,
+                     reserved_priority: int = 0) -> None:
+    """Run an AsyncWorker until stop_event is set, with the same process hooks the dramatiq CLI emits"""
+    broker.emit_after("process_boot")
+    worker = AsyncWorker(broker, handlers, concurrency=concurrency, hook_threads=hook_threads,
+                         reserved_slots=reserved_slots, reserved_priority=reserved_priority)
+    worker.start()
+    logger.info(f"Async worker started, concurrency={concurrency}, reserved_slots={worker.reserved_slots}")
+    try:
+        while not stop_event.wait(timeout=1):
+            pass
+    finally:
+        worker.stop()
+        broker.close()
+        logger.info("Async worker stopped")
@@ -0,0 +1,66 @@
+import math
+from typing import List, Dict
+
+from utils.time_utils import TimeUtils
+
+# Knuth's multiplicative hash constant, spreads sequential channel ids uniformly over the window
+_PHASE_HASH_MULTIPLIER = 2654435761
+_PHASE_HASH_MODULO = 2 ** 32
+
+
+class DispatchPlanner:
+    """
+    Plans delays for messages dispatched in bursts.
+
+    Every channel gets a stable phase offset inside the window, so channels that became due at the same moment
+    are dispatched at different times. Dispatch times are also booked in a calendar of time slots that holds
+    at most rate_per_second dispatches per second, shared by all bursts planned by the instance.
+    Since the next revisit is scheduled from the completion time, the spread carries over to the following cycles.
+    """
+
+    def __init__(self, window_seconds: int, rate_per_second: float, jitter: bool = True):
+        self.window_ms = window_seconds * 1000
+        self.jitter = jitter
+        if rate_per_second > 0:
+            self.slot_ms = max(1000, math.ceil(1000 / rate_per_second))
+            self.slot_capacity = max(1, int(rate_per_second * self.slot_ms / 1000))
+        else:
+            self.slot_ms = None
+            self.slot_capacity = None
+        self._booked_slots: Dict[int, int] = {}
+        # Full slots point towards the next slot that may have room, so booking does not rescan them
+        self._next_free_slots: Dict[int, int] = {}
+
+    def phase_offset_ms(self, channel_id: int) -> int:
+        """Stable offset of the channel inside the dispatch window"""
+        if not self.jitter:
+            return 0
+        return (channel_id * _PHASE_HASH_MULTIPLIER) % _PHASE_HASH_MODULO * self.window_ms // _PHASE_HASH_MODULO
+
+    def plan(self, channel_ids: List[int]) -> List[int]:
+        """Return dispatch delay in milliseconds for every channel, in the order of channel_ids"""
+        now_ms = int(TimeUtils.current_datetime().timestamp() * 1000)
+        desired = [now_ms + self.phase_offset_ms(channel_id) for channel_id in channel_ids]
+        if self.slot_ms is None:
+            return [dispatch_at_ms - now_ms for dispatch_at_ms in desired]
+
+        current_slot = now_ms // self.slot_ms
+        self._booked_slots = {slot: count for slot, count in self._booked_slots.items() if slot >= current_slot}
+        self._next_free_slots = {slot: free for slot, free in self._next_free_slots.items() if slot >= current_slot}
+
+        delays = []
+        for dispatch_at_ms in desired:
+            slot = self._book_slot(dispatch_at_ms // self.slot_ms)
+            delays.append(max(dispatch_at_ms, slot * self.slot_ms) - now_ms)
+        return delays
+
+    def _book_slot(self, slot: int) -> int:
+        """Book the first slot with room starting from given one"""
+        full_slots = []
+        while self._booked_slots.get(slot, 0) >= self.slot_capacity:
+            full_slots.append(slot)
+            slot = self._next_free_slots.get(slot, slot + 1)
+        for full_slot in full_slots:
+            self._next_free_slots[full_slot] = slot
+        self._booked_slots[slot] = self._booked_slots.get(slot, 0) + 1
+        return slot
@@ -0,0 +1,65 @@
+import threading
+from typing import Optional, Set
+
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.tasks_repository import TasksRepository, lease_expiry
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+
+class TaskLeaseHeartbeat:
+    """
+    Extends leases of the tasks a worker process is executing.
+    Messages in flight are tracked in memory, a background thread extends all their leases with one UPDATE
+    every interval_seconds. Once the process dies the leases run out and the task reaper requeues the tasks.
+    """
+
+    def __init__(self, tasks_repository: TasksRepository, interval_seconds: int):
+        self.tasks_repository = tasks_repository
+        self.interval = interval_seconds
+        self._message_ids: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, message_id: str) -> None:
+        """Keep the lease of the task alive until it is removed"""
+        with self._lock:
+            self._message_ids.add(message_id)
+
+    def remove(self, message_id: str) -> None:
+        with self._lock:
+            self._message_ids.discard(message_id)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="task-lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def beat(self) -> int:
+        """Extend leases of all tasks in flight, return how many were extended"""
+        with self._lock:
+            message_ids = list(self._message_ids)
+        if not message_ids:
+            return 0
+        with get_session() as session:
+            return self.tasks_repository.extend_leases(
+                session, message_ids, lease_expiry(TimeUtils.current_datetime())
+            )
+
+    def _run(self) -> None:
+        while not self._stopped.wait(timeout=self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.error(f"Failed to extend task leases: {str(e)}")
@@ -0,0 +1,138 @@
+import asyncio
+import traceback
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from injector import inject
+from sqlalchemy import Row
+
+from config import settings
+from infrastructure.nity.telegram_bot_client import TelegramBotClient
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.user_notifications_repository import UserNotificationsRepository
+from utils.logger import AppLogger
+from utils.metrics import NOTIFICATION_DIGESTS
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+CHANNEL_READY_MESSAGE = "Мы успешно собрали информацию по твоему каналу!"
+CHANNELS_READY_DIGEST = "Мы успешно собрали информацию по твоим каналам, всего: {count}!"
+
+
+def digest_message(channel_ids: List[int]) -> str:
+    """Text of one message covering all given channels of a user"""
+    count = len(set(channel_ids))
+    return CHANNEL_READY_MESSAGE if count == 1 else CHANNELS_READY_DIGEST.format(count=count)
+
+
+class RateLimiter:
+    """Spaces calls on one event loop evenly, at most rate_per_second of them start in a second"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1 / rate_per_second
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class NotificationSender:
+    """
+    Sends user notifications queued by the workers to the Telegram bot.
+    Each batch claims every pending notification of the users with one due and sends a single digest per user,
+    so channels of a user completing in a burst end up in one message. Sends are rate limited across users.
+    A failed digest is retried after NOTIFICATION_RETRY_DELAY_SECONDS, up to NOTIFICATION_MAX_ATTEMPTS times.
+    """
+
+    @inject
+    def __init__(self, notifications_repository: UserNotificationsRepository,
+                 telegram_bot_client: TelegramBotClient):
+        self.notifications_repository = notifications_repository
+        self.telegram_bot_client = telegram_bot_client
+        self.rate_limiter = RateLimiter(settings.NOTIFICATION_RATE_PER_SECOND)
+        self._running = False
+
+    async def start(self):
+        """Start the sender loop"""
+        self._running = True
+        while self._running:
+            try:
+                users = await self.send_once()
+                if users < settings.NOTIFICATION_BATCH_SIZE:
+                    await asyncio.sleep(settings.NOTIFICATION_POLL_INTERVAL_MS / 1000)
+            except Exception as e:
+                logger.error(f"Error in notification sender loop: {str(e)}")
+                traceback.print_exc()
+                await asyncio.sleep(5)
+
+    def stop(self):
+        """Stop the sender loop"""
+        self._running = False
+
+    async def send_once(self) -> int:
+        """Send digests of one batch of due notifications, return how many users were notified or failed"""
+        now = TimeUtils.current_datetime()
+        rows = await asyncio.to_thread(self._claim, now)
+        by_user: Dict[int, List[Row]] = defaultdict(list)
+        for row in rows:
+            by_user[row.user_id].append(row)
+        if not by_user:
+            return 0
+
+        results = await asyncio.gather(*(
+            self._send_digest(user_id, user_rows) for user_id, user_rows in by_user.items()
+        ))
+        sent, failed = [], []
+        for user_rows, success in zip(by_user.values(), results):
+            (sent if success else failed).extend(user_rows)
+        await asyncio.to_thread(self._finish, sent, failed)
+        notified = sum(results)
+        NOTIFICATION_DIGESTS.labels(outcome="sent").inc(notified)
+        NOTIFICATION_DIGESTS.labels(outcome="failed").inc(len(by_user) - notified)
+        logger.info(f"Sent {notified} notification digests covering {len(sent)} notifications, "
+                    f"{len(by_user) - notified} failed")
+        return len(by_user)
+
+    def _claim(self, now: datetime) -> List[Row]:
+        with get_session() as session:
+            return self.notifications_repository.claim_due_notifications(
+                session, now, settings.NOTIFICATION_BATCH_SIZE,
+                now + timedelta(seconds=settings.NOTIFICATION_CLAIM_SECONDS)
+            )
+
+    async def _send_digest(self, user_id: int, rows: List[Row]) -> bool:
+        await self.rate_limiter.acquire()
+        try:
+            async with self.telegram_bot_client.connection():
+                return await self.telegram_bot_client.notify_nity_user(
+                    nity_user_id=user_id,
+                    message=digest_message([row.channel_id for row in rows])
+                )
+        except Exception as e:
+            logger.error(f"Failed to notify user {user_id}: {str(e)}")
+            return False
+
+    def _finish(self, sent: List[Row], failed: List[Row]) -> None:
+        """Delete sent notifications, reschedule failed ones and drop those out of attempts"""
+        retried, abandoned = self._split_by_attempts(failed)
+        for row in abandoned:
+            logger.error(f"Giving up on notification {row.id} of user {row.user_id} for channel {row.channel_id} "
+                         f"after {row.attempts + 1} attempts")
+        with get_session() as session:
+            self.notifications_repository.delete_notifications(session, [row.id for row in sent + abandoned])
+            self.notifications_repository.reschedule_notifications(
+                session, [row.id for row in retried],
+                TimeUtils.current_datetime() + timedelta(seconds=settings.NOTIFICATION_RETRY_DELAY_SECONDS)
+            )
+
+    @staticmethod
+    def _split_by_attempts(rows: List[Row]) -> Tuple[List[Row], List[Row]]:
+        retried = [row for row in rows if row.attempts + 1 < settings.NOTIFICATION_MAX_ATTEMPTS]
+        abandoned = [row for row in rows if row.attempts + 1 >= settings.NOTIFICATION_MAX_ATTEMPTS]
+        return retried, abandoned
@@ -0,0 +1,112 @@
+import select
+import threading
+import time
+from typing import Optional
+
+import dramatiq
+import psycopg2
+from injector import inject
+from sqlalchemy.engine import make_url
+
+from config import settings
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.schema import TASK_OUTBOX_CHANNEL
+from infrastructure.pg_repositories.task_outbox_repository import TaskOutboxRepository
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+RETRY_DELAY_SECONDS = 5
+
+
+class OutboxRelay:
+    """
+    Publishes task messages from task_outbox to the broker in the background.
+    Messages are deleted only after the broker accepted them, so every committed task gets its message at least once.
+    Claimed rows are locked with SKIP LOCKED, several relays can drain the same outbox.
+    """
+
+    @inject
+    def __init__(self, outbox_repository: TaskOutboxRepository):
+        self.outbox_repository = outbox_repository
+        self._dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._listen_connection = None
+
+    def start(self) -> None:
+        """Start relaying in a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+        logger.info("Outbox relay started")
+
+    def stop(self) -> None:
+        """Stop relaying after the current batch"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=settings.OUTBOX_RELAY_POLL_INTERVAL_MS / 1000 + RETRY_DELAY_SECONDS)
+            self._thread = None
+        self._close_listen_connection()
+
+    def relay_once(self) -> int:
+        """Publish one batch of due messages and return how many were published"""
+        # Lazy import, the task queue sets up the broker and actors the messages refer to
+        from services.tasks_queue import enqueue_messages
+        with get_session() as session:
+            rows = self.outbox_repository.claim_due_messages(
+                session=session,
+                due_before=TimeUtils.current_datetime(),
+                limit=settings.OUTBOX_RELAY_BATCH_SIZE
+            )
+            if not rows:
+                session.rollback()
+                return 0
+            messages = [dramatiq.Message.decode(bytes(row.message)) for row in rows]
+            unpublished_message_ids = set(enqueue_messages(messages))
+            published_ids = [
+                row.id for row, message in zip(rows, messages) if message.message_id not in unpublished_message_ids
+            ]
+            # Unpublished messages are released with the claim and picked up by a later batch
+            self.outbox_repository.delete_messages(session, published_ids)
+            if unpublished_message_ids:
+                raise ConnectionError(f"Failed to publish {len(unpublished_message_ids)} outbox messages")
+            return len(published_ids)
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                if self.relay_once() < settings.OUTBOX_RELAY_BATCH_SIZE:
+                    self._wait_for_messages()
+            except Exception as e:
+                logger.error(f"Error in outbox relay loop: {str(e)}")
+                self._close_listen_connection()
+                time.sleep(RETRY_DELAY_SECONDS)
+
+    def _wait_for_messages(self) -> None:
+        """Block until a task_outbox insert is notified or the poll interval passes"""
+        if self._listen_connection is None:
+            connection = psycopg2.connect(self._dsn)
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {TASK_OUTBOX_CHANNEL}")
+            self._listen_connection = connection
+            # Messages inserted before LISTEN took effect are picked up by the next batch
+            return
+        ready, _, _ = select.select([self._listen_connection], [], [], settings.OUTBOX_RELAY_POLL_INTERVAL_MS / 1000)
+        if ready:
+            self._listen_connection.poll()
+            self._listen_connection.notifies.clear()
+
+    def _close_listen_connection(self) -> None:
+        if self._listen_connection is not None:
+            try:
+                self._listen_connection.close()
+            except Exception:
+                pass
+            self._listen_connection = None
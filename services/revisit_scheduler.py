@@ -1,27 +1,41 @@
 import asyncio
+import time
 import traceback
+from typing import List
 
 from injector import inject
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
 from domain.models import TaskCreate, TaskType, TaskStatus
-from infrastructure.pg_repositories.engine import get_session
-from infrastructure.pg_repositories.tracked_channels_repository import TrackedChannelsRepository
+from infrastructure.pg_repositories.async_engine import get_async_session
+from infrastructure.pg_repositories.tracked_channels_repository import AsyncTrackedChannelsRepository
+from services.dispatch_planner import DispatchPlanner
 from services.tasks_service import TasksService
 from utils.logger import AppLogger
+from utils.metrics import SCHEDULER_TICK_SECONDS, SCHEDULER_PLANNED_CHANNELS, SCHEDULER_DUE_CHANNELS
 from utils.time_utils import TimeUtils
 
 logger = AppLogger.get_logger(__name__)
 
+# Channel is not planned for revisit while it has a revisit task in one of these statuses. A failed revisit waiting
+# for its retry is pending, a dead-lettered one does not hold back the next revisit.
+REVISIT_BLOCKING_STATUSES = [TaskStatus.PENDING, TaskStatus.RUNNING]
+
 
 class RevisitScheduler:
 
     @inject
-    def __init__(self, repository: TrackedChannelsRepository, tasks_service: TasksService):
+    def __init__(self, repository: AsyncTrackedChannelsRepository, tasks_service: TasksService):
         self.repository = repository
         self.tasks_service = tasks_service
         self._running = False
         self._last_run = None
+        self._dispatch_planner = DispatchPlanner(
+            window_seconds=settings.REVISIT_CHECK_INTERVAL_SECONDS,
+            rate_per_second=settings.REVISIT_DISPATCH_RATE_PER_SECOND,
+            jitter=settings.REVISIT_DISPATCH_JITTER
+        )
 
     async def start(self):
         """Start the scheduler loop"""
@@ -29,7 +43,9 @@ class RevisitScheduler:
         while self._running:
             try:
                 logger.info("Starting revisit scheduler loop")
-                await self._process_due_channels()
+                started = time.perf_counter()
+                SCHEDULER_PLANNED_CHANNELS.set(await self._process_due_channels())
+                SCHEDULER_TICK_SECONDS.observe(time.perf_counter() - started)
                 self._last_run = TimeUtils.current_datetime()
                 # Wait for next interval
                 await asyncio.sleep(settings.REVISIT_CHECK_INTERVAL_SECONDS)
@@ -43,53 +59,45 @@ class RevisitScheduler:
         """Stop the scheduler loop"""
         self._running = False
 
-    async def _process_due_channels(self):
-        """Process all channels that are due for revisit"""
+    async def _process_due_channels(self) -> int:
+        """Process all channels that are due for revisit and return how many were planned"""
         try:
-            # Get channels that need revisiting based on interval
-            with get_session() as session:
-                channels = self.repository.get_channels_due_revisit(
-                    session=session,
-                    interval_minutes=settings.REVISIT_INTERVAL_MINUTES
-                )
-
-                for channel in channels:
-                    try:
-                        # Create revisit task using TasksService
-                        maybe_pending_task = self.tasks_service.get_task_by_status(channel_id=channel.channel_id,
-                                                                                   task_type=TaskType.REVISIT_CHANNEL,
-                                                                                   task_status=TaskStatus.PENDING)
-                        if maybe_pending_task:
-                            logger.info(f"Revisit task for channel {channel.channel_id} is already pending")
-                            continue
-
-                        maybe_failed_task = self.tasks_service.get_task_by_status(channel_id=channel.channel_id,
-                                                                                  task_type=TaskType.REVISIT_CHANNEL,
-                                                                                  task_status=TaskStatus.FAILED)
-                        if maybe_failed_task:
-                            logger.info(f"Revisit task for channel {channel.channel_id} was failed. It will be retried")
-                            continue
-
-                        maybe_running_task = self.tasks_service.get_task_by_status(channel_id=channel.channel_id,
-                                                                                   task_type=TaskType.REVISIT_CHANNEL,
-                                                                                   task_status=TaskStatus.RUNNING)
-                        if maybe_running_task:
-                            logger.info(f"Revisit task for channel {channel.channel_id} is already running")
-                            continue
-
-                        task, error = await self.tasks_service.create_task(
-                            TaskCreate(
-                                task_type=TaskType.REVISIT_CHANNEL,
-                                channel_id=channel.channel_id
-                            )
-                        )
-                        logger.info(
-                            f"Created revisit task {task.id} for channel {channel.channel_id}"
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Failed to create revisit task for channel {channel.channel_id}: {str(e)}"
-                        )
+            due_before = TimeUtils.current_datetime()
+            async with get_async_session() as session:
+                SCHEDULER_DUE_CHANNELS.set(await self.repository.count_due_channels(session, due_before))
+            planned = 0
+            # Claim due channels without pending or running revisit task chunk by chunk.
+            # Claims of concurrent scheduler instances never overlap, so each channel is planned once. A chunk is
+            # claimed and gets its tasks in one transaction, channels whose tasks could not be created stay due.
+            while True:
+                async with get_async_session() as session:
+                    channel_ids = await self.repository.claim_due_channels(
+                        session=session,
+                        due_before=due_before,
+                        task_type=TaskType.REVISIT_CHANNEL,
+                        blocking_statuses=REVISIT_BLOCKING_STATUSES,
+                        limit=settings.REVISIT_BATCH_SIZE,
+                        lease_minutes=settings.REVISIT_INTERVAL_MINUTES
+                    )
+                    if not channel_ids:
+                        break
+                    await self._create_revisit_tasks(session, channel_ids)
+                planned += len(channel_ids)
+                # Let other coroutines run between batches
+                await asyncio.sleep(0)
+            logger.info(f"Planned revisit for {planned} channels")
+            return planned
         except Exception as e:
             logger.error(f"Error processing due channels: {str(e)}")
             raise
+
+    async def _create_revisit_tasks(self, session: AsyncSession, channel_ids: List[int]):
+        """Create and enqueue revisit tasks for a batch of claimed channels, committing the claim with them"""
+        tasks, error = await self.tasks_service.create_tasks_bulk(
+            [TaskCreate(task_type=TaskType.REVISIT_CHANNEL, channel_id=channel_id) for channel_id in channel_ids],
+            delays_ms=self._dispatch_planner.plan(channel_ids),
+            session=session
+        )
+        if error:
+            logger.error(f"Failed to enqueue revisit tasks: {error}")
+        logger.info(f"Planned {sum(task is not None for task in tasks)} revisit tasks")
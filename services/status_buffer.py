@@ -0,0 +1,226 @@
+import glob
+import json
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from domain.models import TaskStatus
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.tasks_repository import TasksRepository
+from infrastructure.pg_repositories.tracked_channels_repository import TrackedChannelsRepository
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+TIMESTAMP_FIELDS = ("started_at", "completed_at", "lease_expires_at")
+
+
+class TaskStatusBuffer:
+    """
+    Write-behind buffer for task status transitions and channel revisit times.
+    Transitions of the same task are merged in memory and completions of many tasks are written by one batched
+    UPDATE. A background thread flushes every flush_interval_ms, or earlier once
+    max_events are waiting. Updates that fail to flush are kept for the next flush; on close they are
+    written to a fallback file of this process next to fallback_file. On start fallback files left by any
+    process are claimed and applied.
+    """
+
+    def __init__(self, tasks_repository: TasksRepository, tracked_channels_repository: TrackedChannelsRepository,
+                 flush_interval_ms: int, max_events: int, fallback_file: str, revisit_interval_minutes: int):
+        self.tasks_repository = tasks_repository
+        self.tracked_channels_repository = tracked_channels_repository
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.fallback_file = fallback_file
+        self.revisit_interval_minutes = revisit_interval_minutes
+
+        self._task_updates: Dict[str, dict] = {}
+        self._revisits: Dict[int, datetime] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_status(self, message_id: str, status: TaskStatus, error_message: Optional[str] = None) -> None:
+        """
+        Buffer status transition of a task, timestamps are taken now as the synchronous path does.
+        Tasks are only started by the lease-checked update_task_status, a buffered RUNNING could not be refused.
+        """
+        if status == TaskStatus.RUNNING:
+            raise ValueError("RUNNING is not buffered, tasks are claimed with TasksRepository.update_task_status")
+        update = {"status": status, "started_at": None, "completed_at": None, "error_message": error_message,
+                  "lease_expires_at": None}
+        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+            update["completed_at"] = TimeUtils.current_datetime()
+        with self._lock:
+            self._merge_task_update(message_id, update)
+            self._count_event()
+
+    def record_revisited(self, channel_id: int) -> None:
+        """Buffer last_revisited update of a channel"""
+        with self._lock:
+            self._revisits[channel_id] = TimeUtils.current_datetime()
+            self._count_event()
+
+    def start(self) -> None:
+        """Start the flush thread and apply updates left by previous runs"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="task-status-buffer", daemon=True)
+        self._thread.start()
+        try:
+            self._load_fallback()
+        except Exception as e:
+            logger.error(f"Failed to apply status buffer fallback files: {str(e)}")
+
+    def close(self) -> None:
+        """Stop the flush thread and write out everything buffered"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        if not self.flush():
+            self._save_fallback()
+
+    def flush(self) -> bool:
+        """Write buffered updates to the database, returns False if they were kept for a retry"""
+        with self._flush_lock:
+            with self._lock:
+                task_updates, self._task_updates = self._task_updates, {}
+                revisits, self._revisits = self._revisits, {}
+                self._events = 0
+            if not task_updates and not revisits:
+                return True
+
+            try:
+                with get_session() as session:
+                    self.tasks_repository.apply_status_updates(
+                        session, [{"message_id": message_id, **update} for message_id, update in task_updates.items()]
+                    )
+                    self.tracked_channels_repository.update_last_revisited_many(
+                        session, revisits, self.revisit_interval_minutes
+                    )
+                logger.debug(f"Flushed {len(task_updates)} task updates and {len(revisits)} revisits")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to flush task status buffer, updates are kept for a retry: {str(e)}")
+                self._restore(task_updates, revisits)
+                return False
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _count_event(self) -> None:
+        self._events += 1
+        if self._events >= self.max_events:
+            self._wakeup.set()
+
+    def _merge_task_update(self, message_id: str, update: dict) -> None:
+        """Put update over the pending one of the same task, fields it does not set keep their pending value"""
+        pending = self._task_updates.get(message_id)
+        if pending is None:
+            self._task_updates[message_id] = update
+            return
+        for key, value in update.items():
+            if value is not None:
+                pending[key] = value
+
+    def _restore(self, task_updates: Dict[str, dict], revisits: Dict[int, datetime]) -> None:
+        """Put back updates of a failed flush under the ones recorded since"""
+        with self._lock:
+            newer_updates, self._task_updates = self._task_updates, task_updates
+            for message_id, update in newer_updates.items():
+                self._merge_task_update(message_id, update)
+            for channel_id, revisited_at in revisits.items():
+                self._revisits.setdefault(channel_id, revisited_at)
+
+    def _save_fallback(self) -> None:
+        with self._lock:
+            task_updates, self._task_updates = self._task_updates, {}
+            revisits, self._revisits = self._revisits, {}
+        path = self._process_file()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as file:
+            for message_id, update in task_updates.items():
+                record = {"message_id": message_id, **update, "status": update["status"].value}
+                for field in TIMESTAMP_FIELDS:
+                    if record[field] is not None:
+                        record[field] = record[field].isoformat()
+                file.write(json.dumps(record) + "\n")
+            for channel_id, revisited_at in revisits.items():
+                file.write(json.dumps({"channel_id": channel_id, "revisited_at": revisited_at.isoformat()}) + "\n")
+        logger.warning(f"Saved {len(task_updates)} task updates and {len(revisits)} revisits to {path}")
+
+    def _process_file(self, suffix: str = "") -> str:
+        """Fallback file of this process, worker processes on all hosts sharing the directory get their own"""
+        root, ext = os.path.splitext(self.fallback_file)
+        return f"{root}.{socket.gethostname()}-{os.getpid()}{suffix}{ext}"
+
+    def _claim_fallback_files(self) -> list:
+        """
+        Rename fallback files of previous runs to names of this process, so processes starting at the same time
+        do not apply them twice. Files another process claimed first are skipped.
+        """
+        root, ext = os.path.splitext(self.fallback_file)
+        claimed = []
+        for index, path in enumerate([self.fallback_file] + sorted(glob.glob(f"{root}.*{ext}"))):
+            if path.endswith(f".loading{ext}"):
+                continue
+            target = self._process_file(f".{index}.loading")
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _load_fallback(self) -> None:
+        """
+        Apply updates of claimed fallback files. Once read they are held in memory, so updates that cannot be
+        written now are retried by the flush thread and saved again on close. Lines that cannot be read are skipped.
+        """
+        paths = self._claim_fallback_files()
+        if not paths:
+            return
+        applied = 0
+        for path in paths:
+            with open(path) as file:
+                lines = [line for line in file if line.strip()]
+            for line in lines:
+                try:
+                    applied += self._load_record(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Skipped unreadable line of {path}: {str(e)}")
+            os.remove(path)
+        if self.flush():
+            logger.info(f"Applied {applied} updates from {len(paths)} status buffer fallback files")
+
+    def _load_record(self, record: dict) -> bool:
+        """Buffer one record of a fallback file, returns whether it was kept"""
+        if "channel_id" in record:
+            revisited_at = datetime.fromisoformat(record["revisited_at"])
+            with self._lock:
+                self._revisits[record["channel_id"]] = revisited_at
+            return True
+        message_id = record.pop("message_id")
+        record["status"] = TaskStatus(record["status"])
+        # Files of older versions may hold buffered starts, they are dropped as a start has to pass the lease check
+        if record["status"] == TaskStatus.RUNNING:
+            return False
+        for field in TIMESTAMP_FIELDS:
+            # Files written before leases were tracked have no lease_expires_at
+            if record.setdefault(field, None) is not None:
+                record[field] = datetime.fromisoformat(record[field])
+        with self._lock:
+            self._merge_task_update(message_id, record)
+        return True
@@ -0,0 +1,80 @@
+import asyncio
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Tuple
+
+from injector import inject
+
+from config import settings
+from domain.models import TaskType, TaskStatus
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.task_outbox_repository import TaskOutboxRepository
+from infrastructure.pg_repositories.tasks_repository import TasksRepository
+from services.task_retries import retry_messages
+from utils.logger import AppLogger
+from utils.metrics import TASKS_RECLAIMED
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+
+class TaskReaper:
+    """
+    Gives tasks abandoned in RUNNING back to the workers.
+    A running task whose lease was not extended in time lost its worker. The abandoned run counts as a failed
+    attempt: the task is put back to PENDING and its message is written to the outbox again under the same message ID
+    after the retry backoff, in one transaction per batch. A task out of attempts is dead-lettered instead.
+    """
+
+    @inject
+    def __init__(self, tasks_repository: TasksRepository, outbox_repository: TaskOutboxRepository):
+        self.tasks_repository = tasks_repository
+        self.outbox_repository = outbox_repository
+        self._running = False
+        # Reclaimed tasks by type and resulting status since start
+        self.reclaimed: Counter[Tuple[TaskType, TaskStatus]] = Counter()
+
+    async def start(self):
+        """Start the reaper loop"""
+        self._running = True
+        while self._running:
+            try:
+                await asyncio.to_thread(self.run_once)
+                await asyncio.sleep(settings.TASK_REAPER_INTERVAL_SECONDS)
+            except Exception as e:
+                logger.error(f"Error in task reaper loop: {str(e)}")
+                traceback.print_exc()
+                await asyncio.sleep(5)
+
+    def stop(self):
+        """Stop the reaper loop"""
+        self._running = False
+
+    def run_once(self) -> int:
+        """Reclaim all tasks with an expired lease batch by batch, return how many were reclaimed"""
+        now = TimeUtils.current_datetime()
+        requeued = 0
+        while True:
+            batch = self.requeue_expired(now)
+            requeued += batch
+            if batch < settings.TASK_REAPER_BATCH_SIZE:
+                break
+        if requeued:
+            totals = {f"{task_type.value}/{status.value}": count for (task_type, status), count in self.reclaimed.items()}
+            logger.warning(f"Reclaimed {requeued} tasks with an expired lease, since start: {totals}")
+        return requeued
+
+    def requeue_expired(self, now: datetime) -> int:
+        """Reclaim one batch of tasks whose lease expired before given time"""
+        with get_session() as session:
+            tasks = self.tasks_repository.requeue_expired_tasks(
+                session, now, settings.TASK_REAPER_BATCH_SIZE, settings.TASK_MAX_ATTEMPTS
+            )
+            self.outbox_repository.add_messages(session, retry_messages(tasks, now))
+        self.reclaimed.update((task.task_type, task.status) for task in tasks)
+        for task in tasks:
+            TASKS_RECLAIMED.labels(task_type=task.task_type.value, status=task.status.value).inc()
+            logger.info(f"Reclaimed task {task.id} of type {task.task_type} for channel {task.channel_id} "
+                        f"after {task.attempts} attempts, now {task.status}")
+        return len(tasks)
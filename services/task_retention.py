@@ -0,0 +1,89 @@
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from typing import List
+
+from injector import inject
+
+from config import settings
+from domain.models import TaskStatus
+from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.tasks_archive_repository import TasksArchiveRepository
+from utils.logger import AppLogger
+from utils.time_utils import TimeUtils
+
+logger = AppLogger.get_logger(__name__)
+
+# Tasks in these statuses are moved out of the tasks table once they are older than TASKS_HOT_RETENTION_DAYS
+ARCHIVED_STATUSES = [TaskStatus.COMPLETED, TaskStatus.CANCELLED]
+# Failed and dead-lettered tasks stay for TASKS_FAILED_RETENTION_DAYS, so they can be looked into, and are archived
+# after it
+FAILED_ARCHIVED_STATUSES = [TaskStatus.FAILED, TaskStatus.DEAD_LETTERED]
+
+
+class TaskRetentionJob:
+    """
+    Keeps the tasks table down to active tasks and recent history.
+    Old finished tasks are moved to tasks_archive, old archive months are exported to files and dropped.
+    """
+
+    @inject
+    def __init__(self, archive_repository: TasksArchiveRepository):
+        self.archive_repository = archive_repository
+        self._running = False
+
+    async def start(self):
+        """Start the retention loop"""
+        self._running = True
+        while self._running:
+            try:
+                # Runs blocking COPY and batched moves, keep them off the event loop
+                await asyncio.to_thread(self.run_once)
+                await asyncio.sleep(settings.TASKS_RETENTION_INTERVAL_SECONDS)
+            except Exception as e:
+                logger.error(f"Error in task retention loop: {str(e)}")
+                traceback.print_exc()
+                await asyncio.sleep(60)
+
+    def stop(self):
+        """Stop the retention loop"""
+        self._running = False
+
+    def run_once(self) -> int:
+        """Archive old finished tasks and expire old archive months, return how many tasks were moved"""
+        now = TimeUtils.current_datetime()
+        moved = self.archive_tasks(now - timedelta(days=settings.TASKS_HOT_RETENTION_DAYS), ARCHIVED_STATUSES)
+        moved += self.archive_tasks(
+            now - timedelta(days=settings.TASKS_FAILED_RETENTION_DAYS), FAILED_ARCHIVED_STATUSES
+        )
+        self.expire_archive(now - timedelta(days=settings.TASKS_ARCHIVE_RETENTION_DAYS))
+        return moved
+
+    def archive_tasks(self, created_before: datetime, statuses: List[TaskStatus]) -> int:
+        """Move tasks in given statuses created before given time to the archive batch by batch"""
+        moved = 0
+        while True:
+            with get_session() as session:
+                batch = self.archive_repository.archive_finished_tasks(
+                    session=session,
+                    created_before=created_before,
+                    statuses=statuses,
+                    limit=settings.TASKS_RETENTION_BATCH_SIZE
+                )
+            moved += batch
+            if batch < settings.TASKS_RETENTION_BATCH_SIZE:
+                break
+        logger.info(f"Moved {moved} {', '.join(status.name for status in statuses)} tasks created before "
+                    f"{created_before} to the archive")
+        return moved
+
+    def expire_archive(self, created_before: datetime) -> List[str]:
+        """Export archive months that ended before given time to files and drop them, return written files"""
+        with get_session() as session:
+            partitions = self.archive_repository.get_partitions_before(session, created_before)
+        files = []
+        for name in partitions:
+            path = self.archive_repository.export_and_drop_partition(name, settings.TASKS_ARCHIVE_DIR)
+            if path is not None:
+                files.append(path)
+        return files
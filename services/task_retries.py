@@ -0,0 +1,45 @@
+import random
+from datetime import timedelta, datetime
+from typing import List, Optional
+
+from config import settings
+from domain.models import TaskStatus
+from domain.rows import TaskRow
+
+
+def retry_backoff(attempts: int) -> timedelta:
+    """
+    Delay before the run following given number of failed attempts.
+    Doubles with every attempt up to the maximum, the upper half is random so retries of tasks that failed
+    together, e.g. on an outage of channel intelligence, spread out instead of arriving at once.
+    """
+    backoff_ms = min(settings.TASK_RETRY_MAX_BACKOFF_MS,
+                     settings.TASK_RETRY_MIN_BACKOFF_MS * 2 ** max(attempts - 1, 0))
+    return timedelta(milliseconds=backoff_ms / 2 + random.uniform(0, backoff_ms / 2))
+
+
+def defer_backoff(retry_after_seconds: float) -> timedelta:
+    """
+    Delay of a task deferred as channel intelligence was not called, at least retry_after_seconds.
+    Up to double of it at random, so tasks deferred together don't all come back when the service recovers.
+    """
+    delay_ms = max(retry_after_seconds * 1000, settings.TASK_RETRY_MIN_BACKOFF_MS)
+    return timedelta(milliseconds=delay_ms * random.uniform(1, 2))
+
+
+def retry_messages(tasks: List[TaskRow], now: datetime, delay: Optional[timedelta] = None) -> List[dict]:
+    """
+    Outbox messages of tasks put back to PENDING, each one delayed by the given delay or by its retry backoff
+    after a failed attempt
+    """
+    # Lazy import, the task queue sets up the broker and actors the messages are built for
+    from services.tasks_queue import build_task_message
+    return [
+        {
+            "message_id": task.message_id,
+            "message": build_task_message(task.task_type, task.channel_id, task.message_id).encode(),
+            "available_at": now + (delay if delay is not None else retry_backoff(task.attempts)),
+        }
+        for task in tasks
+        if task.status == TaskStatus.PENDING
+    ]
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Set, AsyncIterator
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from config import settings
+from domain.errors import UnavailableError
+from domain.models import TaskStatusChange, TaskStatus, TaskType
+from infrastructure.pg_repositories.schema import TASK_STATUS_CHANNEL
+from utils.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Listeners and subscribers get None after the connection was re-established, changes made meanwhile are lost
+StatusChangeListener = Callable[[Optional[TaskStatusChange]], None]
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+RECONNECT_DELAY_SECONDS = 5
+KEEPALIVE_INTERVAL_SECONDS = 30
+# Subscribing fails after this long without a listening connection instead of hanging until the database is back
+SUBSCRIBE_TIMEOUT_SECONDS = 10
+
+
+class TaskStatusFeed:
+    """
+    Task status changes from a single Postgres LISTEN connection, fanned out to in-process subscribers.
+    Every status write to the tasks table is published by a trigger, so changes made by any process show up here.
+    """
+
+    def __init__(self):
+        self._dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self._listeners: List[StatusChangeListener] = []
+        self._by_task: Dict[int, Set[asyncio.Queue]] = {}
+        self._by_channel: Dict[int, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    def add_listener(self, listener: StatusChangeListener) -> None:
+        """Call listener with every change, used for cache invalidation"""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """Start listening in the background of the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: Optional[int] = None,
+                        channel_id: Optional[int] = None) -> AsyncIterator[asyncio.Queue]:
+        """
+        Queue of changes of one task or all tasks of a channel.
+        Returns once the feed is listening, so state read after that cannot miss a change.
+        Raises UnavailableError if the feed is not listening within SUBSCRIBE_TIMEOUT_SECONDS.
+        """
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        subscriptions = self._by_task if task_id is not None else self._by_channel
+        key = task_id if task_id is not None else channel_id
+        subscriptions.setdefault(key, set()).add(queue)
+        try:
+            try:
+                await asyncio.wait_for(self._connected.wait(), timeout=SUBSCRIBE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise UnavailableError("Task status feed is not connected")
+            yield queue
+        finally:
+            queues = subscriptions.get(key)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del subscriptions[key]
+
+    async def _run(self) -> None:
+        listened = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self._dsn)
+                terminated = asyncio.Event()
+                connection.add_termination_listener(lambda _: terminated.set())
+                await connection.add_listener(TASK_STATUS_CHANNEL, self._on_notification)
+                if listened:
+                    # Reconnected, whatever changed while the connection was down has to be read again
+                    self._dispatch(None, self._all_queues())
+                listened = True
+                self._connected.set()
+                logger.info(f"Listening to {TASK_STATUS_CHANNEL} notifications")
+
+                while not terminated.is_set():
+                    try:
+                        await asyncio.wait_for(terminated.wait(), timeout=KEEPALIVE_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Fails fast if the connection died without closing
+                        await connection.execute("SELECT 1", timeout=KEEPALIVE_INTERVAL_SECONDS)
+                logger.warning("Task status listener connection was closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task status listener failed: {str(e)}")
+            finally:
+                # New subscribers wait for the reconnect, state they read meanwhile could miss changes
+                self._connected.clear()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            change = TaskStatusChange(
+                id=data["id"],
+                channel_id=data["channel_id"],
+                # Enum columns store member names
+                task_type=TaskType[data["task_type"]],
+                status=TaskStatus[data["status"]]
+            )
+        except Exception as e:
+            logger.error(f"Malformed task status notification {payload}: {str(e)}")
+            return
+        queues = self._by_task.get(change.id, set()) | self._by_channel.get(change.channel_id, set())
+        self._dispatch(change, queues)
+
+    def _dispatch(self, change: Optional[TaskStatusChange], queues: Set[asyncio.Queue]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                logger.error(f"Task status listener failed: {str(e)}")
+        for queue in queues:
+            if queue.full():
+                # Slow consumer, only the latest statuses matter
+                queue.get_nowait()
+            queue.put_nowait(change)
+
+    def _all_queues(self) -> Set[asyncio.Queue]:
+        return {queue for queues in (*self._by_task.values(), *self._by_channel.values()) for queue in queues}
@@ -3,9 +3,11 @@ from http.server import BaseHTTPRequestHandler, HTTPServer
 
 from dramatiq import middleware
 
+from utils.metrics import render_metrics
+
 
 class SimpleHealthCheck(middleware.Middleware):
-    """Simple health check middleware that returns 200 OK"""
+    """Simple health check middleware that returns 200 OK, and metrics of all worker processes on /metrics"""
 
     def __init__(self, port: int = 8080):
         self.port = port
@@ -18,6 +20,12 @@ class SimpleHealthCheck(middleware.Middleware):
                     self.send_response(200)
                     self.end_headers()
                     self.wfile.write(b'OK')
+                elif self.path == '/metrics':
+                    body, content_type = render_metrics()
+                    self.send_response(200)
+                    self.send_header('Content-Type', content_type)
+                    self.end_headers()
+                    self.wfile.write(body)
                 else:
                     self.send_response(404)
                     self.end_headers()
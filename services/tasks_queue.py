@@ -1,59 +1,68 @@
-import asyncio
-from typing import Union
+from typing import Union, List, Optional
 
 import dramatiq
+from dramatiq import Middleware
+from dramatiq.common import current_millis
+from injector import Injector
 
 from config import settings
 from domain.models import TaskType
 from infrastructure.di.container import get_worker_container
 from infrastructure.nity.channel_intelligence_client import ChannelIntelligenceClient
 from infrastructure.rabbitmq.broker_client import BrokerClient
-from services.tasks_worker import TaskExecutionMiddleware
+from services.tasks_worker import TaskExecutionMiddleware, PUBLISHED_AT_OPTION
 from utils.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
 
-# Initialize broker with middleware
-container = get_worker_container()
-broker_client = container.get(BrokerClient)
-middleware = container.get(TaskExecutionMiddleware)
-broker_client.broker.add_middleware(middleware=middleware)
+# Broker only, actors below are declared on it. Importing this module neither connects anywhere nor builds the worker
+# container, the scheduler imports it just to build and publish messages.
+broker_client = BrokerClient()
 # Set broker as default for dramatiq
 dramatiq.set_broker(broker_client.broker)
 
-intelligence_client = container.get(ChannelIntelligenceClient)
+# Set by setup_worker
+container: Optional[Injector] = None
+intelligence_client: Optional[ChannelIntelligenceClient] = None
 
 
-async def _start_tracking_channel_async(channel_id: str):
-    """Async implementation of channel tracking"""
+def setup_worker() -> None:
+    """
+    Build the worker container and add task execution middleware to the broker, once per process.
+    The executor calls it before forking worker processes, so they inherit everything built here.
+    """
+    global container, intelligence_client
+    if container is not None:
+        return
+    worker_container = get_worker_container()
+    broker_client.broker.add_middleware(middleware=worker_container.get(TaskExecutionMiddleware))
+    intelligence_client = worker_container.get(ChannelIntelligenceClient)
+    container = worker_container
 
-    async with intelligence_client.connection():
-        success, message = await intelligence_client.start_tracking_new_channel(channel_id=int(channel_id))
-        logger.info(f"Start tracking result: Success={success}, Message={message}")
-        return success, message
 
+class WorkerSetup(Middleware):
+    """Sets up worker processes that were not forked from a set up executor, e.g. started with the dramatiq CLI"""
 
-async def _revisit_channel_async(channel_id: str):
-    """Async implementation of channel revisiting"""
-    async with intelligence_client.connection():
-        success, message = await intelligence_client.revisit_channel(channel_id=int(channel_id))
-        logger.info(f"Revisit result: Success={success}, Message={message}")
-        return success, message
+    def after_process_boot(self, broker):
+        setup_worker()
 
 
-@dramatiq.actor(queue_name=settings.RABBITMQ_CHANNEL_TASKS_QUEUE)
-def start_tracking_channel(channel_id: Union[str, int]):
+broker_client.broker.add_middleware(WorkerSetup())
+
+
+async def start_tracking_channel_async(channel_id: Union[str, int]):
     """
     Start tracking a new channel.
-    This will be executed when a new channel needs to be added to tracking.
+    Coroutine behind the start_tracking_channel actor, awaited directly by the async worker.
     """
     # Convert channel_id to string if it's an integer
     channel_id_str = str(channel_id)
     logger.info(f"Starting to track channel: {channel_id_str}")
 
     try:
-        # Run the async function in the event loop
-        success, message = asyncio.run(_start_tracking_channel_async(channel_id_str))
+        async with intelligence_client.connection():
+            success, message = await intelligence_client.start_tracking_new_channel(channel_id=int(channel_id_str))
+            logger.info(f"Start tracking result: Success={success}, Message={message}")
 
         if not success:
             logger.error(f"Failed to start tracking channel {channel_id_str}: {message}")
@@ -66,19 +75,19 @@ def start_tracking_channel(channel_id: Union[str, int]):
         raise
 
 
-@dramatiq.actor(queue_name=settings.RABBITMQ_CHANNEL_TASKS_QUEUE)
-def revisit_channel(channel_id: Union[str, int]):
+async def revisit_channel_async(channel_id: Union[str, int]):
     """
     Revisit an existing channel to update its data.
-    This will be executed periodically for channels we're already tracking.
+    Coroutine behind the revisit_channel actor, awaited directly by the async worker.
     """
     # Convert channel_id to string if it's an integer
     channel_id_str = str(channel_id)
     logger.info(f"Revisiting channel: {channel_id_str}")
 
     try:
-        # Run the async function in the event loop
-        success, message = asyncio.run(_revisit_channel_async(channel_id_str))
+        async with intelligence_client.connection():
+            success, message = await intelligence_client.revisit_channel(channel_id=int(channel_id_str))
+            logger.info(f"Revisit result: Success={success}, Message={message}")
 
         if not success:
             logger.error(f"Failed to revisit channel {channel_id_str}: {message}")
@@ -91,19 +100,68 @@ def revisit_channel(channel_id: Union[str, int]):
         raise
 
 
-def enqueue_task(task_type: TaskType, channel_id: Union[str, int]) -> str:
+# Dramatiq retries are off, failed runs are retried by TaskExecutionMiddleware with backoff tracked on the task row.
+# Start tracking is requested by a user waiting for the result, so it is routed to its own queue and taken
+# before revisits. Actors are looked up by name, messages already in the shared queue still get processed.
+@dramatiq.actor(queue_name=settings.RABBITMQ_INTERACTIVE_TASKS_QUEUE, priority=settings.START_TRACKING_PRIORITY,
+                max_retries=0)
+def start_tracking_channel(channel_id: Union[str, int]):
+    """
+    Start tracking a new channel.
+    This will be executed when a new channel needs to be added to tracking.
+    """
+    # Run the async function on the long-lived event loop of this worker thread
+    intelligence_client.run(start_tracking_channel_async(channel_id))
+
+
+@dramatiq.actor(queue_name=settings.RABBITMQ_CHANNEL_TASKS_QUEUE, priority=settings.REVISIT_CHANNEL_PRIORITY,
+                max_retries=0)
+def revisit_channel(channel_id: Union[str, int]):
     """
-    Enqueue a task based on its type and return the message ID.
-    Channel ID can be either string or integer.
+    Revisit an existing channel to update its data.
+    This will be executed periodically for channels we're already tracking.
     """
-    actor = {
+    # Run the async function on the long-lived event loop of this worker thread
+    intelligence_client.run(revisit_channel_async(channel_id))
+
+
+# Coroutines run by the async worker in place of the actors, by actor name
+ASYNC_ACTOR_HANDLERS = {
+    start_tracking_channel.actor_name: start_tracking_channel_async,
+    revisit_channel.actor_name: revisit_channel_async,
+}
+
+
+def _actor_for_task_type(task_type: TaskType) -> dramatiq.Actor:
+    return {
         TaskType.START_TRACKING: start_tracking_channel,
         TaskType.REVISIT_CHANNEL: revisit_channel,
     }[task_type]
 
-    message = actor.send(str(channel_id))
-    return message.message_id
 
+def build_task_message(task_type: TaskType, channel_id: Union[str, int],
+                       message_id: Optional[str] = None) -> dramatiq.Message:
+    """
+    Build a task message without sending it.
+    Message ID is generated on build, so it can be stored before the message is published. Passing the ID of an
+    existing task builds its message again.
+    """
+    message = _actor_for_task_type(task_type).message(str(channel_id))
+    return message.copy(message_id=message_id) if message_id else message
 
-def ping() -> None:
-    return None
+
+def enqueue_messages(messages: List[dramatiq.Message]) -> List[str]:
+    """
+    Publish prebuilt messages in order and return IDs of the messages that were not published.
+    Broker keeps a channel per thread, so the whole batch goes through the same channel.
+    """
+    broker = dramatiq.get_broker()
+    for index, message in enumerate(messages):
+        try:
+            # Workers measure how long the message waited in the queue from this
+            published = message.copy(options={**message.options, PUBLISHED_AT_OPTION: current_millis()})
+            broker.enqueue(published)
+        except (ConnectionError, dramatiq.errors.ConnectionError) as e:
+            logger.error(f"Failed to publish message {message.message_id}: {str(e)}")
+            return [unpublished.message_id for unpublished in messages[index:]]
+    return []
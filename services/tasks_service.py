@@ -1,24 +1,51 @@
-from typing import Optional, Tuple
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, List, AsyncIterator, Dict, Union
 
 from injector import inject
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from domain.models import TaskCreate, Task, TaskStatus, TaskType
-from infrastructure.pg_repositories.engine import get_session
-from infrastructure.pg_repositories.tasks_repository import TasksRepository
+from config import settings
+from domain.errors import NotFoundError
+from domain.models import TaskCreate, Task, TaskStatus, TaskStatusChange, TaskFilter
+from domain.rows import TaskRow
+from infrastructure.pg_repositories.async_engine import get_async_session
+from infrastructure.pg_repositories.tasks_repository import AsyncTasksRepository
+from services.task_status_feed import TaskStatusFeed
 from utils.logger import AppLogger
+from utils.metrics import TASKS_CREATED
 from utils.time_utils import TimeUtils
+from utils.ttl_cache import TtlLruCache
 
 logger = AppLogger.get_logger(__name__)
 
+# Watching a task ends once it reaches one of these
+FINAL_STATUSES = {
+    TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.DEAD_LETTERED
+}
+
+# A task creation conflicting with an existing task looks it up, which may have finished meanwhile
+CREATE_TASK_ATTEMPTS = 3
+
 
 class TasksService:
 
     @inject
-    def __init__(self, tasks_repository: TasksRepository):
+    def __init__(self, tasks_repository: AsyncTasksRepository, status_feed: TaskStatusFeed):
         self.tasks_repo = tasks_repository
+        self.status_feed = status_feed
+        self.status_feed.add_listener(self._on_status_change)
+        # Polled by clients waiting for task progress, so reads are served from memory for a short while
+        self.task_cache: TtlLruCache[Optional[Task]] = TtlLruCache(
+            max_size=settings.TASKS_CACHE_MAX_SIZE, ttl_seconds=settings.TASKS_CACHE_TTL_SECONDS
+        )
+        self.channel_tasks_cache: TtlLruCache[List[Task]] = TtlLruCache(
+            max_size=settings.TASKS_CACHE_MAX_SIZE, ttl_seconds=settings.TASKS_CACHE_TTL_SECONDS
+        )
 
     async def start(self):
         """Initialize service"""
+        self.status_feed.start()
         logger.info("Tasks service started successfully")
 
     def stop(self):
@@ -28,44 +55,229 @@ class TasksService:
     async def create_task(
             self,
             task_create: TaskCreate,
-            user_id_to_notify: Optional[int] = None
+            user_id_to_notify: Optional[int] = None,
+            idempotency_key: Optional[str] = None
     ) -> Tuple[
         Optional[Task], Optional[str]]:
-        """Create and enqueue a new task"""
+        """
+        Create a new task, its message is written to the outbox in the same transaction and published by the relay.
+        If the channel already has a pending or running task of the type, or a task was created with the same
+        idempotency key, that task is returned and nothing is enqueued.
+        """
         try:
-            with get_session() as session:
+            from services.tasks_queue import build_task_message
+            async with get_async_session() as session:
+                for _ in range(CREATE_TASK_ATTEMPTS):
+                    # Message ID is stored with the task, so the task exists before a worker can get the message
+                    message = build_task_message(task_type=task_create.task_type, channel_id=task_create.channel_id)
+                    task = await self.tasks_repo.create_task(
+                        session=session,
+                        message_id=message.message_id,
+                        task_type=task_create.task_type,
+                        channel_id=task_create.channel_id,
+                        user_id_to_notify=user_id_to_notify,
+                        idempotency_key=idempotency_key,
+                        message=message.encode()
+                    )
+                    if task is not None:
+                        break
 
-                # First, store task in database
-                task = self.tasks_repo.create_task(
-                    session=session,
-                    message_id=TimeUtils.current_datetime().isoformat(),
-                    task_type=task_create.task_type,
-                    channel_id=task_create.channel_id,
-                    user_id_to_notify=user_id_to_notify
-                )
+                    # None means the task duplicates an existing one, which is only looked up then
+                    existing = await self._get_existing_task(session, task_create, idempotency_key)
+                    if existing is not None:
+                        logger.info(f"Task {existing.id} of type {existing.task_type} for channel "
+                                    f"{existing.channel_id} already exists")
+                        return existing, None
+                else:
+                    raise RuntimeError(f"Could not create task for channel {task_create.channel_id}, "
+                                       f"conflicting task kept changing")
 
-                try:
-                    from services.tasks_queue import enqueue_task
-                    message_id = enqueue_task(task_type=task_create.task_type, channel_id=task_create.channel_id)
-                    # Update task with real message ID
-                    task = self.tasks_repo.update_task_message_id(session, task.id, message_id)
-                    logger.info(f"Created task {task.id} of type {task.task_type} for channel {task.channel_id}")
-                except ConnectionError as e:
-                    # If broker is unavailable, mark task as failed
-                    task = self.tasks_repo.update_task_status(session,
-                                                              task.message_id,
-                                                              TaskStatus.FAILED,
-                                                              error_message="Failed to connect to message broker. Please try again later.")
-
-                    logger.error(f"Failed to enqueue task {task.id} due to broker connection: {str(e)}")
-                    return task, "Failed to connect to message broker. Please try again later."
+                self.invalidate_task(task)
+                TASKS_CREATED.labels(task_type=task.task_type.value).inc()
+                logger.info(f"Created task {task.id} of type {task.task_type} for channel {task.channel_id}")
                 return task, None
 
         except Exception as e:
             logger.error(f"Failed to create task: {str(e)}")
             raise
 
-    def get_task_by_status(self, channel_id: int, task_type: TaskType, task_status: TaskStatus) -> Optional[Task]:
-        with get_session() as session:
-            return self.tasks_repo.get_task_by_status(session=session, channel_id=channel_id, task_type=task_type,
-                                                      status=task_status)
+    async def create_tasks_bulk(
+            self,
+            task_creates: List[TaskCreate],
+            user_id_to_notify: Optional[int] = None,
+            delays_ms: Optional[List[int]] = None,
+            session: Optional[AsyncSession] = None,
+            idempotency_keys: Optional[List[Optional[str]]] = None
+    ) -> Tuple[List[Optional[TaskRow]], Optional[str]]:
+        """
+        Create a batch of tasks with a single insert, their messages go to the outbox in the same transaction.
+        Optional delays postpone publishing of the matching messages, tasks stay pending meanwhile.
+        Requests duplicating a pending or running task, or the idempotency key of an earlier task, get that task back
+        and publish nothing. Returns one task per request in request order, None where the duplicated task has
+        finished meanwhile or the key was used for a task of another channel or type.
+        Given a session, the insert commits together with what the caller did in it before.
+        """
+        if not task_creates:
+            return [], None
+        try:
+            from services.tasks_queue import build_task_message
+            keys = idempotency_keys or [None] * len(task_creates)
+            messages = [
+                build_task_message(task_type=task_create.task_type, channel_id=task_create.channel_id)
+                for task_create in task_creates
+            ]
+            now = TimeUtils.current_datetime()
+            async with nullcontext(session) if session is not None else get_async_session() as session:
+                created = await self.tasks_repo.create_tasks_bulk(
+                    session=session,
+                    tasks=[
+                        {
+                            "message_id": message.message_id,
+                            "task_type": task_create.task_type,
+                            "channel_id": task_create.channel_id,
+                            "user_id_to_notify": user_id_to_notify,
+                            "idempotency_key": key,
+                            "message": message.encode(),
+                            "available_at": now + timedelta(milliseconds=delays_ms[index]) if delays_ms else now,
+                        }
+                        for index, (message, task_create, key) in enumerate(zip(messages, task_creates, keys))
+                    ]
+                )
+                created_by_message_id = {task.message_id: task for task in created}
+                for task in created:
+                    TASKS_CREATED.labels(task_type=task.task_type.value).inc()
+                    self.invalidate_task(task)
+
+                tasks = [created_by_message_id.get(message.message_id) for message in messages]
+                if len(created) < len(task_creates):
+                    await self._resolve_duplicates(session, task_creates, keys, tasks)
+                    logger.info(f"Skipped {len(task_creates) - len(created)} duplicate tasks")
+
+                logger.info(f"Created {len(created)} tasks in bulk")
+                return tasks, None
+
+        except Exception as e:
+            logger.error(f"Failed to create tasks: {str(e)}")
+            raise
+
+    async def _resolve_duplicates(self, session: AsyncSession, task_creates: List[TaskCreate],
+                                  keys: List[Optional[str]], tasks: List[Optional[TaskRow]]) -> None:
+        """
+        Fill in tasks of requests that were not created: the task of their idempotency key, or else the active task
+        of the channel and type. Same rules as _get_existing_task, a key of another channel or type gives None.
+        """
+        pending = [index for index, task in enumerate(tasks) if task is None]
+        created_by_key = {key: task for key, task in zip(keys, tasks) if key and task is not None}
+        by_key = {**await self.tasks_repo.get_tasks_by_idempotency_keys(session, list({
+            keys[index] for index in pending if keys[index] and keys[index] not in created_by_key
+        })), **created_by_key}
+        active_lookups = []
+        for index in pending:
+            key, task_create = keys[index], task_creates[index]
+            task = by_key.get(key) if key else None
+            if task is None:
+                active_lookups.append(index)
+            elif (task.channel_id, task.task_type) == (task_create.channel_id, task_create.task_type):
+                tasks[index] = task
+            else:
+                logger.warning(f"Idempotency key {key} was used for another task")
+        active = await self.tasks_repo.get_active_tasks(session, list({
+            (task_creates[index].channel_id, task_creates[index].task_type) for index in active_lookups
+        }))
+        active_by_key = {(task.channel_id, task.task_type): task for task in active}
+        for index in active_lookups:
+            tasks[index] = active_by_key.get((task_creates[index].channel_id, task_creates[index].task_type))
+
+    async def get_task(self, task_id: int) -> Optional[Task]:
+        """Get task by ID, read through the task cache"""
+        hit, task = self.task_cache.get_entry(task_id)
+        if hit:
+            return task
+        async with get_async_session() as session:
+            task = await self.tasks_repo.get_task_by_id(session=session, task_id=task_id)
+        self.task_cache.set(task_id, task)
+        return task
+
+    async def get_channel_tasks(self, channel_id: int) -> List[Task]:
+        """Get latest CHANNEL_TASKS_LIMIT tasks of a channel, read through the channel tasks cache"""
+        hit, tasks = self.channel_tasks_cache.get_entry(channel_id)
+        if hit:
+            return tasks
+        async with get_async_session() as session:
+            tasks = await self.tasks_repo.get_tasks_by_channel(
+                session=session, channel_id=channel_id, limit=settings.CHANNEL_TASKS_LIMIT
+            )
+        self.channel_tasks_cache.set(channel_id, tasks)
+        return tasks
+
+    async def list_tasks(self, task_filter: TaskFilter, after: Optional[Tuple[datetime, int]] = None,
+                         limit: Optional[int] = None) -> AsyncIterator[Task]:
+        """
+        Yield tasks matching the filter in (created_at, id) order, continuing after given key.
+        Every page is read by its own short query, so a slow consumer holds neither a connection nor a transaction.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = settings.TASKS_LIST_PAGE_SIZE if remaining is None \
+                else min(settings.TASKS_LIST_PAGE_SIZE, remaining)
+            async with get_async_session() as session:
+                tasks = await self.tasks_repo.get_tasks_page(session, task_filter, page_size, after)
+            for task in tasks:
+                yield task
+            if len(tasks) < page_size:
+                return
+            after = (tasks[-1].created_at, tasks[-1].id)
+            if remaining is not None:
+                remaining -= len(tasks)
+
+    async def watch_task(self, task_id: int) -> AsyncIterator[Union[Task, TaskStatusChange]]:
+        """Yield current state of the task and then each status change until the task is finished"""
+        async with self.status_feed.subscribe(task_id=task_id) as changes:
+            task = await self.get_task(task_id)
+            if task is None:
+                raise NotFoundError(f"Task {task_id} not found")
+            yield task
+            status = task.status
+            while status not in FINAL_STATUSES:
+                change = await changes.get()
+                if change is None:
+                    change = await self.get_task(task_id)
+                if change is not None and change.status != status:
+                    status = change.status
+                    yield change
+
+    async def watch_channel_tasks(self, channel_id: int) -> AsyncIterator[Union[Task, TaskStatusChange]]:
+        """Yield current state of latest tasks of the channel and then every status change of its tasks"""
+        async with self.status_feed.subscribe(channel_id=channel_id) as changes:
+            statuses: Dict[int, TaskStatus] = {}
+            current = await self.get_channel_tasks(channel_id)
+            while True:
+                for task in current:
+                    if statuses.get(task.id) != task.status:
+                        statuses[task.id] = task.status
+                        yield task
+                change = await changes.get()
+                current = [change] if change is not None else await self.get_channel_tasks(channel_id)
+
+    def _on_status_change(self, change: Optional[TaskStatusChange]) -> None:
+        if change is None:
+            self.task_cache.clear()
+            self.channel_tasks_cache.clear()
+            return
+        self.invalidate_task(change)
+
+    async def _get_existing_task(self, session: AsyncSession, task_create: TaskCreate,
+                                 idempotency_key: Optional[str]) -> Optional[Task]:
+        """Task created with the idempotency key, or else active task of the channel and type"""
+        if idempotency_key:
+            task = await self.tasks_repo.get_task_by_idempotency_key(session, idempotency_key)
+            if task is not None:
+                if (task.channel_id, task.task_type) != (task_create.channel_id, task_create.task_type):
+                    raise ValueError(f"Idempotency key {idempotency_key} was used for another task")
+                return task
+        return await self.tasks_repo.get_active_task(session, task_create.channel_id, task_create.task_type)
+
+    def invalidate_task(self, task: Union[Task, TaskRow, TaskStatusChange]) -> None:
+        """Drop cached reads a write of the task makes stale"""
+        self.task_cache.invalidate(task.id)
+        self.channel_tasks_cache.invalidate(task.channel_id)
@@ -1,94 +1,188 @@
-import asyncio
+import time
 import traceback
+from datetime import timedelta
 
 from dramatiq import middleware
 from injector import inject
 
+from config import settings
 from domain.models import TaskStatus, TaskType
-from infrastructure.nity.telegram_bot_client import TelegramBotClient
+from infrastructure.nity.base import CallRejectedError
 from infrastructure.pg_repositories.engine import get_session
+from infrastructure.pg_repositories.task_outbox_repository import TaskOutboxRepository
 from infrastructure.pg_repositories.tasks_repository import TasksRepository
 from infrastructure.pg_repositories.tracked_channels_repository import TrackedChannelsRepository
+from infrastructure.pg_repositories.user_notifications_repository import UserNotificationsRepository
+from services.lease_heartbeat import TaskLeaseHeartbeat
+from services.status_buffer import TaskStatusBuffer
+from services.task_retries import retry_messages, defer_backoff
 from utils.logger import AppLogger
+from utils.metrics import TASK_QUEUE_SECONDS, TASK_RUN_SECONDS
+from utils.time_utils import TimeUtils
 
 logger = AppLogger.get_logger(__name__)
 
+# Name of the services.tasks_queue.revisit_channel actor. Its completion goes through the status buffer, start
+# tracking tasks keep the synchronous path as their completion adds a channel and notifies the user.
+REVISIT_CHANNEL_ACTOR = "revisit_channel"
+
+# Task type of each actor of services.tasks_queue, labels the task metrics
+ACTOR_TASK_TYPES = {
+    "start_tracking_channel": TaskType.START_TRACKING,
+    REVISIT_CHANNEL_ACTOR: TaskType.REVISIT_CHANNEL,
+}
+
+# Message option set on publishing, milliseconds since epoch the message is available to workers from
+PUBLISHED_AT_OPTION = "published_at"
+
 
 class TaskExecutionMiddleware(middleware.Middleware):
     """Middleware to track task execution and manage channel tracking"""
 
     @inject
     def __init__(self, tasks_repository: TasksRepository, tracked_channels_repository: TrackedChannelsRepository,
-                 telegram_bot_client: TelegramBotClient):
+                 notifications_repository: UserNotificationsRepository, status_buffer: TaskStatusBuffer,
+                 lease_heartbeat: TaskLeaseHeartbeat, outbox_repository: TaskOutboxRepository):
         self.tasks_repository = tasks_repository
         self.tracked_channels_repository = tracked_channels_repository
-        self.telegram_bot_client = telegram_bot_client
+        self.notifications_repository = notifications_repository
+        self.status_buffer = status_buffer
+        self.lease_heartbeat = lease_heartbeat
+        self.outbox_repository = outbox_repository
+        # Start of each message in progress for the run duration metric
+        self._started_at = {}
+
+    def after_worker_boot(self, broker, worker):
+        # Leases of running tasks have to be extended even if the buffer cannot start
+        self.lease_heartbeat.start()
+        self.status_buffer.start()
+
+    def after_worker_shutdown(self, broker, worker):
+        self.lease_heartbeat.close()
+        self.status_buffer.close()
 
     def before_process_message(self, broker, message):
         """Set task to RUNNING state"""
         logger.info(f"Starting task with message_id={message.message_id}")
+        published_at = message.options.get(PUBLISHED_AT_OPTION, message.message_timestamp)
+        TASK_QUEUE_SECONDS.labels(task_type=self._task_type_label(message)).observe(
+            max(0, time.time() * 1000 - published_at) / 1000
+        )
+        self._started_at[message.message_id] = time.perf_counter()
+        # Every task is claimed synchronously, the lease check has to pass before channel intelligence is called
         with get_session() as session:
-            self.tasks_repository.update_task_status(
+            task = self.tasks_repository.update_task_status(
                 session=session,
                 message_id=message.message_id,
                 status=TaskStatus.RUNNING
             )
+        if task is None:
+            # Redelivered message of a finished or cancelled task, its work is done or superseded, or of a task
+            # another worker is running with a live lease
+            logger.warning(f"No startable task with message_id={message.message_id}, skipping")
+            raise middleware.SkipMessage()
+        self.lease_heartbeat.add(message.message_id)
+
+    def after_skip_message(self, broker, message):
+        self.lease_heartbeat.remove(message.message_id)
+        self._observe_run(message, "skipped")
 
     def after_process_message(self, broker, message, *, result=None, exception=None):
         """Handle task completion and channel tracking"""
+        self.lease_heartbeat.remove(message.message_id)
+        rejected = isinstance(exception, CallRejectedError)
+        self._observe_run(message, "completed" if exception is None else "deferred" if rejected else "failed")
         try:
-            status = TaskStatus.COMPLETED if exception is None else TaskStatus.FAILED
-            error_message = str(exception) if exception else None
+            if rejected:
+                self._defer(message, exception)
+                return
+
+            if exception is not None:
+                self._record_failed_attempt(message, str(exception))
+                return
+
+            if message.actor_name == REVISIT_CHANNEL_ACTOR:
+                # Channel id is the actor argument, so neither update needs the task row
+                self.status_buffer.record_status(message.message_id, TaskStatus.COMPLETED)
+                self.status_buffer.record_revisited(int(message.args[0]))
+                return
 
             # Update task status
             with get_session() as session:
-                updated_task = self.tasks_repository.update_task_status(
+                task = self.tasks_repository.update_task_status(
                     session=session,
                     message_id=message.message_id,
-                    status=status,
-                    error_message=error_message
+                    status=TaskStatus.COMPLETED
                 )
-                task = self.tasks_repository.get_task_by_id(session, updated_task.id)
                 if not task:
-                    logger.error(f"Task not found, message_id={message.message_id}")
+                    logger.error(f"Active task not found, message_id={message.message_id}")
                     return
 
-                if status == TaskStatus.COMPLETED:
-                    if task.task_type == TaskType.START_TRACKING:
-
-                        # Add new channel to tracking
-                        channel_id = int(task.channel_id)
-                        maybe_tracked_channel = self.tracked_channels_repository.get_channel(session, channel_id)
-                        if maybe_tracked_channel:
-                            logger.info(f"Channel {channel_id} is already tracked")
-                        else:
-                            self.tracked_channels_repository.add_channel(session, channel_id)
-                            logger.info(f"Started tracking channel {channel_id}")
-                            if task.user_id_to_notify:
-                                asyncio.run(
-                                    self._notify_user(
-                                        nity_user_id=task.user_id_to_notify,
-                                        message="Мы успешно собрали информацию по твоему каналу!"
-                                    )
+                if task.task_type == TaskType.START_TRACKING:
+                    # Add new channel to tracking
+                    channel_id = int(task.channel_id)
+                    maybe_tracked_channel = self.tracked_channels_repository.get_channel(session, channel_id)
+                    if maybe_tracked_channel:
+                        logger.info(f"Channel {channel_id} is already tracked")
+                    else:
+                        self.tracked_channels_repository.add_channel(session, channel_id,
+                                                                     settings.REVISIT_INTERVAL_MINUTES)
+                        logger.info(f"Started tracking channel {channel_id}")
+                        if task.user_id_to_notify:
+                            # Sent by the notification sender, together with other channels of the user
+                            # completing within the digest window
+                            self.notifications_repository.add_notification(
+                                session, task.user_id_to_notify, channel_id,
+                                available_at=TimeUtils.current_datetime() + timedelta(
+                                    seconds=settings.NOTIFICATION_DIGEST_WINDOW_SECONDS
                                 )
-                                logger.info(f"Successfully notified user {task.user_id_to_notify}")
-
-                    elif task.task_type == TaskType.REVISIT_CHANNEL:
-                        # Update last revisit time
-                        channel_id = int(task.channel_id)
-                        self.tracked_channels_repository.update_last_revisited(session, channel_id)
-                        logger.info(f"Updated last visit time for channel {channel_id}")
+                            )
+                            logger.info(f"Queued notification of user {task.user_id_to_notify}")
 
         except Exception as e:
             traceback.print_exc()
-            logger.error(f"Error in task completion handling: {str(e)}, task_id={task.id}, message={message}")
+            logger.error(f"Error in task completion handling: {str(e)}, message={message}")
         finally:
             logger.info(f"Task with message_id={message.message_id} processing complete")
 
+    def _observe_run(self, message, outcome: str) -> None:
+        started_at = self._started_at.pop(message.message_id, None)
+        if started_at is not None:
+            TASK_RUN_SECONDS.labels(task_type=self._task_type_label(message), outcome=outcome).observe(
+                time.perf_counter() - started_at
+            )
+
+    @staticmethod
+    def _task_type_label(message) -> str:
+        task_type = ACTOR_TASK_TYPES.get(message.actor_name)
+        return task_type.value if task_type else message.actor_name
+
+    def _defer(self, message, rejection: CallRejectedError) -> None:
+        """Put the task back to PENDING with a delayed retry in the outbox, the rejected run is not an attempt"""
+        delay = defer_backoff(rejection.retry_after)
+        with get_session() as session:
+            task = self.tasks_repository.defer_task(session, message.message_id, str(rejection))
+            self.outbox_repository.add_messages(
+                session, retry_messages([task], TimeUtils.current_datetime(), delay) if task else []
+            )
+        if task is None:
+            logger.error(f"Active task not found, message_id={message.message_id}")
+        else:
+            logger.warning(f"Task {task.id} deferred by {delay.total_seconds():.0f}s: {str(rejection)}")
 
-    async def _notify_user(self, nity_user_id: int, message: str):
-        async with self.telegram_bot_client.connection():
-            await self.telegram_bot_client.notify_nity_user(
-                nity_user_id=nity_user_id,
-                message=message
+    def _record_failed_attempt(self, message, error_message: str) -> None:
+        """Put the task back to PENDING with a delayed retry in the outbox, or dead-letter it once out of attempts"""
+        with get_session() as session:
+            task = self.tasks_repository.record_failed_attempt(
+                session, message.message_id, error_message, settings.TASK_MAX_ATTEMPTS
+            )
+            self.outbox_repository.add_messages(
+                session, retry_messages([task], TimeUtils.current_datetime()) if task else []
             )
+        if task is None:
+            logger.error(f"Active task not found, message_id={message.message_id}")
+        elif task.status == TaskStatus.DEAD_LETTERED:
+            logger.error(f"Task {task.id} failed {task.attempts} times and was dead-lettered: {error_message}")
+        else:
+            logger.warning(f"Task {task.id} failed attempt {task.attempts} of {settings.TASK_MAX_ATTEMPTS}, "
+                           f"retry is scheduled: {error_message}")
@@ -1,6 +1,7 @@
 from aiohttp import web
 
 from utils.logger import AppLogger
+from utils.metrics import render_metrics
 
 logger = AppLogger.get_logger(__name__)
 
@@ -9,8 +10,14 @@ async def health_handler(request):
     return web.Response(text='OK', status=200)
 
 
+async def metrics_handler(request):
+    body, content_type = render_metrics()
+    return web.Response(body=body, headers={'Content-Type': content_type})
+
+
 app = web.Application()
 app.router.add_get('/health', health_handler)
+app.router.add_get('/metrics', metrics_handler)
 
 
 async def run_health_server():
@@ -0,0 +1,66 @@
+import os
+from typing import Tuple
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, \
+    generate_latest, multiprocess
+
+# Metrics are per process. The executor sets PROMETHEUS_MULTIPROC_DIR before anything imports prometheus_client,
+# so all its worker processes write their values to files there and /metrics sums them up.
+
+TASKS_CREATED = Counter(
+    "nity_tasks_created_total", "Tasks created, duplicates of active tasks excluded", ["task_type"]
+)
+TASK_QUEUE_SECONDS = Histogram(
+    "nity_task_queue_seconds", "Time from publishing a task message until a worker started the task", ["task_type"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+)
+TASK_RUN_SECONDS = Histogram(
+    "nity_task_run_seconds", "Time from a worker starting a task until it finished, by outcome",
+    ["task_type", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 600)
+)
+TASKS_RECLAIMED = Counter(
+    "nity_tasks_reclaimed_total", "Tasks with an expired lease reclaimed by the task reaper, by resulting status",
+    ["task_type", "status"]
+)
+SCHEDULER_TICK_SECONDS = Histogram(
+    "nity_revisit_scheduler_tick_seconds", "Duration of one revisit scheduler pass over due channels",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+SCHEDULER_PLANNED_CHANNELS = Gauge(
+    "nity_revisit_scheduler_planned_channels", "Channels claimed and planned for a revisit by the last scheduler pass",
+    multiprocess_mode="max"
+)
+SCHEDULER_DUE_CHANNELS = Gauge(
+    "nity_revisit_scheduler_due_channels", "Revisiting channels due at the start of the last scheduler pass",
+    multiprocess_mode="max"
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "nity_db_pool_checkout_seconds", "Wait for a connection from the database pool", ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+GRPC_HANDLER_SECONDS = Histogram(
+    "nity_grpc_handler_seconds", "Duration of gRPC handlers, streams are measured until they end",
+    ["method", "status"]
+)
+GRPC_CLIENT_CONCURRENCY_LIMIT = Gauge(
+    "nity_grpc_client_concurrency_limit", "Adaptive limit of calls in flight to a service, summed over processes",
+    ["client"], multiprocess_mode="livesum"
+)
+GRPC_CLIENT_REJECTED_CALLS = Counter(
+    "nity_grpc_client_rejected_calls_total", "Calls to a service rejected without calling it, by reason",
+    ["client", "reason"]
+)
+NOTIFICATION_DIGESTS = Counter(
+    "nity_notification_digests_total", "Notification digests sent to users, by outcome", ["outcome"]
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format and their content type"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+TValue = TypeVar('TValue')
+
+_MISSING = object()
+
+
+class TtlLruCache(Generic[TValue]):
+    """
+    In-process cache with a time to live for entries and a size bound with least recently used eviction.
+    Stored None is a valid value, get_entry tells it apart from a miss.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, TValue]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: Hashable) -> Tuple[bool, Optional[TValue]]:
+        """Return (hit, value)"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: TValue) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()